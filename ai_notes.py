@@ -0,0 +1,205 @@
+"""AI file notes: one participant at a time or a whole batch before plan reviews.
+
+Prompts go through a NoteGenerator, which sends them concurrently under a
+concurrency cap and a requests-per-minute limit, retries transient
+failures with backoff, and caches every note by a hash of its prompt so a
+participant whose figures haven't changed is never billed twice. The
+model sits behind a small backend interface (generate(prompt) -> text):
+GeminiBackend for production, FakeBackend for working offline.
+"""
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from perf import timed
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+# Statuses a plan-review batch covers
+REVIEW_STATUSES = ["CRITICAL SHORTFALL", "MONITORING REQUIRED"]
+DEFAULT_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_RETRIES = 3
+
+def note_prompt(m):
+    """The file-note prompt for one participant's metrics (a dict or row).
+
+    Money is rounded (the outcome to the nearest $100) so that day-to-day
+    drift in the projection doesn't change the prompt and miss the cache.
+    """
+    return (f"Write a strategic NDIS file note for {m['name']}. Status: {m['status']}. "
+            f"Balance: ${m['balance']:,.0f}. Burn: ${m['weekly_cost']:,.0f}/wk. "
+            f"Outcome: ${round(m['surplus'], -2):,.0f}. Plan ends: {m['plan_end']:%d %b %Y}. "
+            f"Tone: Professional Australian NDIS.")
+
+class GeminiBackend:
+    """Google Gemini. The client is configured once, here, not on every request."""
+
+    def __init__(self, api_key, model=DEFAULT_MODEL):
+        import google.generativeai as genai
+        from google.api_core import exceptions
+        genai.configure(api_key=api_key)
+        self.name = model
+        self._model = genai.GenerativeModel(model)
+        # Rate limiting and server-side hiccups; anything else (bad key, blocked prompt) fails straight away
+        self.retryable = (exceptions.ResourceExhausted, exceptions.ServiceUnavailable, exceptions.DeadlineExceeded,
+                          exceptions.InternalServerError, exceptions.TooManyRequests)
+
+    def generate(self, prompt):
+        return self._model.generate_content(prompt).text
+
+class FakeBackendError(Exception):
+    pass
+
+class FakeBackend:
+    """Offline stand-in: a canned note per prompt after `latency` seconds.
+
+    fail_first makes each prompt fail that many times before succeeding,
+    to exercise retries. calls counts requests actually made.
+    """
+
+    retryable = (FakeBackendError,)
+
+    def __init__(self, latency=0.0, fail_first=0):
+        self.name = "fake"
+        self.latency = latency
+        self.fail_first = fail_first
+        self.calls = 0
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+            failures = self._failures.get(prompt, 0)
+            self._failures[prompt] = failures + 1
+        time.sleep(self.latency)
+        if failures < self.fail_first:
+            raise FakeBackendError("simulated transient failure")
+        return f"[offline note] {prompt.split('. Tone:')[0]}. Review supports and funding with the participant at plan review."
+
+class RateLimiter:
+    """Spaces requests evenly at `per_minute`, across threads. None or 0 means no limit."""
+
+    def __init__(self, per_minute=None):
+        self.interval = 60 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class NoteCache:
+    """Notes by prompt hash. Kept in the store when there is one, so they survive restarts."""
+
+    def __init__(self, store=None):
+        self._store = store
+        self._notes = {}
+
+    @staticmethod
+    def key(model, prompt):
+        return hashlib.sha256(f"{model}\n{prompt}".encode()).hexdigest()
+
+    def __len__(self):
+        return self._store.count_ai_notes() if self._store is not None else len(self._notes)
+
+    def get_many(self, keys):
+        """{key: note} for the keys that are cached."""
+        if self._store is not None:
+            return self._store.get_ai_notes(list(keys))
+        return {k: self._notes[k] for k in keys if k in self._notes}
+
+    def put(self, key, note):
+        if self._store is not None:
+            self._store.put_ai_notes([(key, note)])
+        else:
+            self._notes[key] = note
+
+class NoteGenerator:
+    """Generates notes through a backend with caching, a concurrency cap, rate limiting and retries.
+
+    Thread-safe: one generator can be shared by every session using the same backend.
+    """
+
+    def __init__(self, backend, cache=None, concurrency=DEFAULT_CONCURRENCY, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 retries=DEFAULT_RETRIES, backoff=1.0):
+        self.backend = backend
+        self.cache = cache if cache is not None else NoteCache()
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = RateLimiter(requests_per_minute)
+
+    def configure(self, concurrency=None, requests_per_minute=None):
+        """Changes the limits for later requests; the rate limit stays shared by everyone using this generator."""
+        if concurrency:
+            self.concurrency = concurrency
+        if requests_per_minute is not None and RateLimiter(requests_per_minute).interval != self.limiter.interval:
+            self.limiter = RateLimiter(requests_per_minute)
+
+    def _call(self, prompt):
+        """One prompt against the backend, retrying transient errors with exponential backoff and jitter."""
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                return self.backend.generate(prompt)
+            except self.backend.retryable:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt * (0.5 + random.random()))
+
+    def generate(self, prompt):
+        """A single note, from the cache if this exact prompt has been answered before."""
+        key = NoteCache.key(self.backend.name, prompt)
+        cached = self.cache.get_many([key])
+        if key in cached:
+            return cached[key]
+        note = self._call(prompt)
+        self.cache.put(key, note)
+        return note
+
+    @timed("NoteGenerator.generate_batch")
+    def generate_batch(self, prompts, progress=None):
+        """Notes for {id: prompt}. Returns {id: {"note", "error", "cached"}}; one failure never stops the batch.
+
+        Cached prompts are answered without a request; the rest run on up
+        to `concurrency` threads. progress(done, total) is called as each
+        one finishes, on the calling thread.
+        """
+        keys = {i: NoteCache.key(self.backend.name, p) for i, p in prompts.items()}
+        cached = self.cache.get_many(set(keys.values()))
+        results = {i: {"note": cached[k], "error": None, "cached": True} for i, k in keys.items() if k in cached}
+        total, done = len(prompts), len(results)
+        if progress and done:
+            progress(done, total)
+        pending = {}
+        for i, p in prompts.items():
+            if i in results:
+                continue
+            # Participants whose prompts are identical share one request
+            pending.setdefault(keys[i], (p, []))[1].append(i)
+        if not pending:
+            return results
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            futures = {pool.submit(self._call, p): (key, ids) for key, (p, ids) in pending.items()}
+            for future in as_completed(futures):
+                key, ids = futures[future]
+                try:
+                    note = future.result()
+                    self.cache.put(key, note)
+                    result = {"note": note, "error": None, "cached": False}
+                except Exception as e:
+                    result = {"note": None, "error": f"{type(e).__name__}: {e}", "cached": False}
+                for i in ids:
+                    results[i] = dict(result)
+                done += len(ids)
+                if progress:
+                    progress(done, total)
+        return results
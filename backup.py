@@ -0,0 +1,98 @@
+"""Versioned columnar (Parquet) caseload backups.
+
+Numbers stay float64 and plan_end is stored as a real date, so a backup
+loads straight into a typed DataFrame that calculate_caseload_metrics can
+take without any per-record parsing. pyarrow is optional; callers should
+check parquet_available() before offering the format.
+"""
+import io
+import pandas as pd
+from utils import RowErrors, parse_money_column
+
+BACKUP_FORMAT = b"xyston-caseload"
+BACKUP_VERSION = 1
+FLOAT_COLUMNS = ["rate", "budget", "balance", "hours"]
+TEXT_COLUMNS = ["id", "name", "ndis_number", "level", "notes"]
+RECORD_FIELDS = ["id", "name", "ndis_number", "level", "rate", "budget", "balance", "plan_end", "hours", "notes"]
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+def parquet_available():
+    return pa is not None
+
+def _schema():
+    return pa.schema([
+        ("id", pa.string()), ("name", pa.string()), ("ndis_number", pa.string()),
+        ("level", pa.dictionary(pa.int32(), pa.string())),
+        ("rate", pa.float64()), ("budget", pa.float64()), ("balance", pa.float64()),
+        ("plan_end", pa.date32()),
+        # Only set when plan_end wasn't a YYYY-MM-DD date, so odd values survive a round trip
+        ("plan_end_text", pa.string()),
+        ("hours", pa.float64()), ("notes", pa.string()), ("exited", pa.bool_()),
+    ], metadata={b"format": BACKUP_FORMAT, b"version": str(BACKUP_VERSION).encode()})
+
+def records_to_frame(records):
+    """Client dicts (JSON backup shape) -> typed DataFrame in the backup schema.
+
+    Numbers are read as Client.from_dict reads them ("$1,000" included).
+    Raises ValueError naming the records whose numbers don't parse rather
+    than writing those fields out blank.
+    """
+    records = list(records)
+    get = lambda field: [r.get(field) for r in records]
+    df = pd.DataFrame({c: get(c) for c in TEXT_COLUMNS}, dtype=object)
+    raw = pd.DataFrame({c: get(c) for c in FLOAT_COLUMNS + ["hours_per_week"]}, dtype=object)
+    errors = []
+    rows = RowErrors(raw, errors, first_row=1)
+    for c in FLOAT_COLUMNS:
+        df[c], invalid = parse_money_column(raw[c])
+        rows.report(invalid, c, "not a number: {value!r}")
+    # Fold legacy hours_per_week into hours, as Client.from_dict does
+    alt, invalid = parse_money_column(raw["hours_per_week"])
+    use_alt = df["hours"].fillna(0) == 0
+    rows.report(invalid & use_alt, "hours_per_week", "not a number: {value!r}")
+    if errors:
+        shown = "; ".join(f"record {e['row']}, {e['column']}: {e['reason']}" for e in errors[:5])
+        raise ValueError(f"{len(errors)} value(s) can't be backed up: {shown}")
+    df["hours"] = df["hours"].mask(use_alt & alt.notna(), alt)
+    raw = pd.Series([None if v is None else str(v) for v in get("plan_end")], dtype=object)
+    df["plan_end"] = pd.to_datetime(raw, format="%Y-%m-%d", errors='coerce')
+    df["plan_end_text"] = raw.where(df["plan_end"].isna() & raw.notna(), None)
+    df["exited"] = [bool(v) for v in get("exited")]
+    return df[[f.name for f in _schema()]]
+
+def write_backup(records):
+    """Serialises records to zstd-compressed Parquet bytes."""
+    table = pa.Table.from_pandas(records_to_frame(records), schema=_schema(), preserve_index=False)
+    buf = io.BytesIO()
+    pq.write_table(table, buf, compression="zstd")
+    return buf.getvalue()
+
+def read_backup(data):
+    """Parquet backup bytes (or file-like) -> DataFrame with datetime64 plan_end. Raises ValueError on foreign files."""
+    source = pa.BufferReader(data) if isinstance(data, (bytes, bytearray)) else data
+    table = pq.read_table(source)
+    meta = table.schema.metadata or {}
+    if meta.get(b"format") != BACKUP_FORMAT:
+        raise ValueError("Not a caseload backup")
+    if int(meta.get(b"version", b"0")) > BACKUP_VERSION:
+        raise ValueError(f"Backup version {meta[b'version'].decode()} is newer than this app supports")
+    df = table.to_pandas(date_as_object=False)
+    return df
+
+def frame_to_records(df):
+    """Typed backup DataFrame -> client dicts in the JSON backup shape. Nulls come back as absent keys."""
+    plan_end = df["plan_end"].dt.strftime("%Y-%m-%d").where(df["plan_end"].notna(), df["plan_end_text"])
+    columns = [plan_end.tolist() if f == "plan_end" else df[f].tolist() for f in RECORD_FIELDS]
+    records = []
+    for values, gone in zip(zip(*columns), df["exited"].tolist()):
+        # v == v drops NaN
+        record = {f: v for f, v in zip(RECORD_FIELDS, values) if v is not None and v == v}
+        if gone:
+            record["exited"] = True
+        records.append(record)
+    return records
@@ -0,0 +1,112 @@
+"""Headless month-end run over a directory of caseload backups.
+
+    python batch_report.py BACKUP_DIR [-o OUT_DIR] [--workers N]
+
+Writes <backup>_report.docx for every .json (and .parquet) backup plus one
+caseload_summary.csv across all of them. Built on utils.py only: it never
+imports streamlit, plotly or google.generativeai.
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from backup import parquet_available, read_backup
+from utils import calculate_caseload_metrics, generate_caseload_report
+
+SUMMARY_COLUMNS = ["caseload", "clients", "skipped", "funds_managed", "monthly_revenue", "projected_outcome",
+                   "ROBUST SURPLUS", "SUSTAINABLE", "MONITORING REQUIRED", "CRITICAL SHORTFALL", "report", "error"]
+# Summed into the TOTAL row
+TOTAL_COLUMNS = SUMMARY_COLUMNS[1:-2]
+
+def load_caseload(path):
+    """Reads one backup into a DataFrame of active (non-exited) clients."""
+    path = pathlib.Path(path)
+    if path.suffix == ".parquet":
+        df = read_backup(path.read_bytes())
+    else:
+        with open(path, encoding="utf-8") as f:
+            df = pd.DataFrame(json.load(f))
+    if "exited" in df:
+        df = df[~df["exited"].fillna(False).astype(bool)]
+    return df
+
+def process_caseload(path, out_dir):
+    """Metrics + Word report for one backup. Returns its summary row; failures are reported, not raised.
+
+    Records whose numbers won't parse are left out of the metrics and counted in "skipped".
+    """
+    path = pathlib.Path(path)
+    row = dict.fromkeys(SUMMARY_COLUMNS)
+    row["caseload"] = path.stem
+    try:
+        clients = load_caseload(path)
+        metrics = calculate_caseload_metrics(clients)
+        report_path = pathlib.Path(out_dir) / f"{path.stem}_report.docx"
+        report_path.write_bytes(generate_caseload_report(metrics))
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+        return row
+
+    counts = metrics["status"].value_counts()
+    row.update({
+        "clients": len(metrics),
+        "skipped": len(clients) - len(metrics),
+        "funds_managed": round(metrics["balance"].sum(), 2),
+        # Same 4.33 weeks/month the dashboard uses
+        "monthly_revenue": round(metrics["weekly_cost"].sum() * 4.33, 2),
+        "projected_outcome": round(metrics["surplus"].sum(), 2),
+        "report": report_path.name,
+        "error": "",
+    })
+    for status in ["ROBUST SURPLUS", "SUSTAINABLE", "MONITORING REQUIRED", "CRITICAL SHORTFALL"]:
+        row[status] = int(counts.get(status, 0))
+    return row
+
+def find_backups(directory):
+    suffixes = {".json", ".parquet"} if parquet_available() else {".json"}
+    return sorted(p for p in pathlib.Path(directory).iterdir() if p.is_file() and p.suffix in suffixes)
+
+def summarise(rows):
+    """Per-caseload rows plus a TOTAL row across the ones that succeeded."""
+    summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+    ok = summary[summary["error"] == ""]
+    total = {c: ok[c].sum() for c in TOTAL_COLUMNS}
+    total.update({"caseload": "TOTAL", "report": "", "error": ""})
+    return pd.concat([summary, pd.DataFrame([total], columns=SUMMARY_COLUMNS)], ignore_index=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch caseload metrics and Word reports.")
+    parser.add_argument("backup_dir", help="directory of caseload_backup .json/.parquet files")
+    parser.add_argument("-o", "--out-dir", default=None, help="where to write reports (default: BACKUP_DIR/reports-YYYY-MM-DD)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    backups = find_backups(args.backup_dir)
+    if not backups:
+        parser.error(f"no backups found in {args.backup_dir}")
+    out_dir = pathlib.Path(args.out_dir or os.path.join(args.backup_dir, f"reports-{datetime.date.today()}"))
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Reports are CPU-bound python-docx work, so each backup gets its own process
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        rows = list(pool.map(process_caseload, backups, [out_dir] * len(backups)))
+
+    summary = summarise(rows)
+    summary.to_csv(out_dir / "caseload_summary.csv", index=False)
+    print(summary.drop(columns=["report"]).to_string(index=False))
+    for r in rows:
+        if r["skipped"]:
+            print(f"SKIPPED {r['caseload']}: {r['skipped']} record(s) with invalid numbers left out", file=sys.stderr)
+    failed = [r for r in rows if r["error"]]
+    for r in failed:
+        print(f"FAILED {r['caseload']}: {r['error']}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+"""Scaling benchmarks for the caseload engine.
+
+    python -m benchmarks.run --sizes 1000 10000
+"""
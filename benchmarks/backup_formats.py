@@ -0,0 +1,37 @@
+"""JSON vs Parquet backup size and load time.
+
+    python -m benchmarks.backup_formats [N ...]
+"""
+import json
+import sys
+import time
+
+import pandas as pd
+
+from backup import read_backup, write_backup
+from benchmarks.synthetic import generate_caseload
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def run(n):
+    records = generate_caseload(n)
+    as_json = json.dumps(records, default=str).encode()
+    as_parquet = write_backup(records)
+    # JSON load includes the DataFrame + date parsing the dashboard would need anyway
+    json_load = best_of(lambda: pd.to_datetime(pd.DataFrame(json.loads(as_json))["plan_end"], format="%Y-%m-%d"))
+    parquet_load = best_of(lambda: read_backup(as_parquet))
+    return {"clients": n, "json_mb": len(as_json) / 1e6, "parquet_mb": len(as_parquet) / 1e6,
+            "json_load_s": json_load, "parquet_load_s": parquet_load}
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000]
+    print(f"{'clients':>8} {'json MB':>9} {'parquet MB':>11} {'json load s':>12} {'parquet load s':>15}")
+    for n in sizes:
+        r = run(n)
+        print(f"{r['clients']:>8} {r['json_mb']:>9.2f} {r['parquet_mb']:>11.2f} {r['json_load_s']:>12.3f} {r['parquet_load_s']:>15.3f}")
@@ -0,0 +1,194 @@
+"""Times the caseload hot paths at increasing caseload sizes.
+
+    python -m benchmarks.run [--sizes 1000 10000 100000 1000000] [--label v7] [--compare results/v6.json]
+
+Each benchmark reports best-of-N wall time, throughput (clients/s) and
+peak traced memory, and the run is saved to benchmarks/results/<label>.json
+so a later run can be compared against it. Timing and memory are measured
+in separate passes because tracemalloc slows the code it watches.
+"""
+import argparse
+import datetime
+import io
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import caseload_csv, generate_caseload
+from caseload import Caseload
+from models import Client
+from projection import project_portfolio
+from simulation import simulate_caseload
+from snapshots import SnapshotHistory
+from utils import MetricsCache, calculate_caseload_metrics, calculate_client_metrics, filter_participants, generate_caseload_report, participant_page, process_csv_upload
+
+RESULTS_DIR = pathlib.Path(__file__).parent / "results"
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+# Regressions smaller than this are treated as noise when comparing runs
+REGRESSION_THRESHOLD = 1.10
+
+def _scalar_metrics(ctx):
+    return [m for m in (calculate_client_metrics(c) for c in ctx["clients"]) if m is not None]
+
+def _vector_metrics(ctx):
+    return calculate_caseload_metrics(pd.DataFrame(ctx["records"]))
+
+def _caseload_metrics(ctx):
+    # What the dashboard does on a cache miss: columns straight into the vectorised metrics
+    return MetricsCache().metrics_for(ctx["caseload"])
+
+def _portfolio_projection(ctx):
+    return project_portfolio(ctx["metrics"], 52)
+
+def _monte_carlo(ctx):
+    return simulate_caseload(ctx["metrics"], trials=1000, seed=0)
+
+def _snapshot(ctx):
+    # A first snapshot, where every participant is new and every field is written
+    return SnapshotHistory().record(ctx["metrics"])
+
+def _csv_import(ctx):
+    return process_csv_upload(io.BytesIO(ctx["csv"]))
+
+def _json_round_trip(ctx):
+    return json.loads(json.dumps(ctx["records"], default=str))
+
+def _report(ctx):
+    return generate_caseload_report(ctx["metrics_records"])
+
+def _styler(ctx):
+    # The Participant List before pagination: the whole frame through Styler, rendered so styles are computed
+    display_df = pd.DataFrame(ctx["metrics"])[['name', 'plan_end', 'status', 'runway_weeks', 'surplus']]
+    display_df.columns = ['Name', 'End Date', 'Health', 'Runway', 'Outcome']
+    styler = display_df.style.format({'Outcome': "${:,.0f}", 'Runway': "{:.1f}"})
+    style_cells = styler.map if hasattr(styler, "map") else styler.applymap
+    style_cells(lambda x: 'color:#f85149; font-weight:bold' if x == 'CRITICAL SHORTFALL' else 'color:#3fb950' if x == 'ROBUST SURPLUS' else '', subset=['Health'])
+    return styler.to_html()
+
+def _participant_table(ctx):
+    # Current Participant List: filter and sort everything, style one 50-row page
+    page, _ = participant_page(filter_participants(ctx["metrics"], statuses=["CRITICAL SHORTFALL", "MONITORING REQUIRED"]), 1, 50, "Health")
+    display_df = page[['name', 'plan_end', 'status', 'runway_weeks', 'surplus']]
+    display_df.columns = ['Name', 'End Date', 'Health', 'Runway', 'Outcome']
+    styler = display_df.style.format({'Outcome': "${:,.0f}", 'Runway': "{:.1f}"})
+    styler.map(lambda x: 'color:#f85149; font-weight:bold' if x == 'CRITICAL SHORTFALL' else 'color:#3fb950' if x == 'ROBUST SURPLUS' else '', subset=['Health'])
+    return styler.to_html()
+
+# name -> (function, largest caseload it is run at)
+BENCHMARKS = {
+    "metrics_scalar": (_scalar_metrics, None),
+    "metrics_vectorised": (_vector_metrics, None),
+    "caseload_metrics": (_caseload_metrics, None),
+    "portfolio_projection": (_portfolio_projection, None),
+    # ~2.5ms per participant at 1,000 trials on one core; spread over a process pool from 5,000 up
+    "monte_carlo": (_monte_carlo, 10_000),
+    "snapshot": (_snapshot, None),
+    "csv_import": (_csv_import, None),
+    "json_round_trip": (_json_round_trip, None),
+    # python-docx writes a page per participant; a million pages is not a meaningful workload
+    "word_report": (_report, 10_000),
+    "dataframe_styler": (_styler, 100_000),
+    "participant_table": (_participant_table, None),
+}
+
+def _context(n, seed):
+    records = generate_caseload(n, seed=seed)
+    metrics = calculate_caseload_metrics(pd.DataFrame(records))
+    return {"records": records, "clients": [Client.from_dict(r) for r in records], "caseload": Caseload(records), "csv": caseload_csv(records), "metrics": metrics,
+            "metrics_records": metrics.to_dict('records')}
+
+def measure(fn, ctx, repeat, memory=True):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(ctx)
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn(ctx)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return min(times), peak
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run(sizes, seed=0, repeat=3, memory=True, only=None):
+    rows = []
+    for n in sizes:
+        ctx = _context(n, seed)
+        for name, (fn, cap) in BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            if cap is not None and n > cap:
+                rows.append({"benchmark": name, "clients": n, "skipped": f"above cap of {cap:,}"})
+                continue
+            seconds, peak = measure(fn, ctx, repeat if n <= 100_000 else 1, memory)
+            rows.append({"benchmark": name, "clients": n, "seconds": seconds,
+                         "clients_per_s": n / seconds if seconds else None,
+                         "peak_mb": peak / 1e6 if peak is not None else None})
+            print(_format_row(rows[-1]), flush=True)
+    return rows
+
+def _format_row(r, baseline=None):
+    if "skipped" in r:
+        return f"{r['benchmark']:<20} {r['clients']:>9,}  skipped ({r['skipped']})"
+    line = f"{r['benchmark']:<20} {r['clients']:>9,} {r['seconds']:>9.3f}s {r['clients_per_s']:>12,.0f}/s"
+    line += f" {r['peak_mb']:>9.1f} MB" if r.get('peak_mb') is not None else f" {'-':>12}"
+    if baseline and baseline.get("seconds"):
+        ratio = r['seconds'] / baseline['seconds']
+        line += f"  x{ratio:.2f} vs baseline" + ("  REGRESSION" if ratio > REGRESSION_THRESHOLD else "")
+    return line
+
+def compare(rows, baseline_rows):
+    """Prints each result against the matching baseline one. Returns the regressed (benchmark, clients) pairs."""
+    baseline = {(r["benchmark"], r["clients"]): r for r in baseline_rows}
+    regressions = []
+    for r in rows:
+        b = baseline.get((r["benchmark"], r["clients"]))
+        print(_format_row(r, b))
+        if b and b.get("seconds") and r.get("seconds") and r["seconds"] / b["seconds"] > REGRESSION_THRESHOLD:
+            regressions.append((r["benchmark"], r["clients"]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Caseload scaling benchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per benchmark (1 above 100k clients)")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run just these benchmarks")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--label", default=None, help="results file name (default: git revision)")
+    parser.add_argument("--compare", type=pathlib.Path, help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    rows = run(args.sizes, seed=args.seed, repeat=args.repeat, memory=not args.no_memory, only=args.only)
+
+    rev = _git_rev()
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"{args.label or rev}.json"
+    out.write_text(json.dumps({
+        "revision": rev, "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "pandas": pd.__version__, "seed": args.seed,
+        "results": rows,
+    }, indent=2))
+    print(f"saved {out}")
+
+    if args.compare:
+        print(f"\ncompared with {args.compare}:")
+        regressions = compare(rows, json.loads(args.compare.read_text())["results"])
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Cold-start cost of the Streamlit entry points.
+
+    python -m benchmarks.startup [--apps app.py streamlit_app.py] [--clients 1000] [--label v7] [--compare results/startup-v6.json]
+
+Every measurement is a fresh interpreter, so nothing is already imported.
+It imports streamlit and pandas (paid by any Streamlit app, reported as
+"base") and then times one full script run through AppTest, on the
+zero-state page and on the active dashboard (a synthetic caseload in a
+temporary SQLite store, opened via CASELOAD_DB). It also lists which of
+the heavy optional modules that run pulled in.
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.run import REGRESSION_THRESHOLD, RESULTS_DIR, _git_rev
+from benchmarks.synthetic import generate_caseload
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ["google.generativeai", "plotly.express", "docx", "requests"]
+PATHS = ["zero_state", "active"]
+
+# Runs in the fresh interpreter; prints one JSON line
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit, pandas
+from streamlit.testing.v1 import AppTest
+base = time.perf_counter() - start
+heavy = {heavy!r}
+already = {{m for m in heavy if m in sys.modules}}
+start = time.perf_counter()
+at = AppTest.from_file({script!r}, default_timeout=600)
+at.run()
+first_run = time.perf_counter() - start
+print(json.dumps({{"base": base, "first_run": first_run, "errors": len(at.exception),
+                  "loaded": [m for m in heavy if m in sys.modules and m not in already]}}))
+"""
+
+def _seed_store(path, clients):
+    sys.path.insert(0, str(ROOT))
+    from caseload import Caseload
+    from store import CaseloadStore
+    store = CaseloadStore(path)
+    Caseload.restore(generate_caseload(clients, seed=0), store=store)
+    store.close()
+
+def measure(app, path, db, repeat):
+    """Best of `repeat` cold starts of one entry point on one path."""
+    env = {k: v for k, v in os.environ.items() if k != "CASELOAD_DB"}
+    if path == "active":
+        env["CASELOAD_DB"] = db
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _CHILD.format(heavy=HEAVY_MODULES, script=str(ROOT / app))],
+                             cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        if best is None or result["first_run"] < best["first_run"]:
+            best = result
+    return {"app": app, "path": path, **best}
+
+def _format_row(r, baseline=None):
+    line = f"{r['app']:<18} {r['path']:<11} base {r['base']:6.2f}s  first run {r['first_run']:6.2f}s  loaded: {', '.join(r['loaded']) or '-'}"
+    if r["errors"]:
+        line += f"  ({r['errors']} exceptions)"
+    if baseline:
+        ratio = r["first_run"] / baseline["first_run"]
+        line += f"  x{ratio:.2f} vs baseline" + ("  REGRESSION" if ratio > REGRESSION_THRESHOLD else "")
+    return line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit cold-start benchmark.")
+    parser.add_argument("--apps", nargs="+", default=["app.py", "streamlit_app.py"])
+    parser.add_argument("--clients", type=int, default=1000, help="caseload size on the active path")
+    parser.add_argument("--repeat", type=int, default=3, help="cold starts per measurement; the fastest is kept")
+    parser.add_argument("--label", default=None, help="results file name (default: git revision)")
+    parser.add_argument("--compare", type=pathlib.Path, help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "caseload.db")
+        _seed_store(db, args.clients)
+        for app in args.apps:
+            for path in PATHS:
+                rows.append(measure(app, path, db, args.repeat))
+                print(_format_row(rows[-1]), flush=True)
+
+    rev = _git_rev()
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"startup-{args.label or rev}.json"
+    out.write_text(json.dumps({
+        "revision": rev, "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0], "clients": args.clients, "results": rows,
+    }, indent=2))
+    print(f"saved {out}")
+
+    if args.compare:
+        print(f"\ncompared with {args.compare}:")
+        baseline = {(r["app"], r["path"]): r for r in json.loads(args.compare.read_text())["results"]}
+        regressions = 0
+        for r in rows:
+            b = baseline.get((r["app"], r["path"]))
+            print(_format_row(r, b))
+            regressions += bool(b and r["first_run"] / b["first_run"] > REGRESSION_THRESHOLD)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""Seeded synthetic caseloads matching the Client schema in types.ts."""
+import datetime
+import random
+import uuid
+
+from utils import RATES, CSV_HEADERS
+
+def generate_caseload(n, seed=0, today=None):
+    """n client dicts. The same seed and date always give the same caseload.
+
+    Budgets are typical support coordination allocations; balances spread
+    from nearly spent to untouched, plan ends from just lapsed to two years
+    out, so every status bucket is represented.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.date.today()
+    levels = list(RATES)
+    records = []
+    for i in range(n):
+        level = levels[0] if rng.random() < 0.8 else levels[1]
+        budget = round(rng.uniform(6000, 24000) * (1.9 if level == levels[1] else 1.0), 2)
+        records.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "name": f"Participant {i:07d}",
+            "ndis_number": str(430000000 + i),
+            "level": level,
+            "rate": RATES[level],
+            "budget": budget,
+            "balance": round(budget * rng.betavariate(2, 2), 2),
+            "plan_end": str(today + datetime.timedelta(days=rng.randint(-14, 730))),
+            "hours": rng.choice([0.5, 1.0, 1.0, 1.5, 1.5, 2.0, 3.0]),
+            "notes": "Plan review booked." if rng.random() < 0.2 else "",
+        })
+    return records
+
+def caseload_csv(records):
+    """The caseload as a bulk-import CSV (bytes) in the template's column layout."""
+    lines = [",".join(CSV_HEADERS)]
+    for c in records:
+        lines.append(f"{c['name']},{c['ndis_number']},{c['level']},{c['budget']},{c['balance']},{c['plan_end']},{c['hours']}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
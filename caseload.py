@@ -0,0 +1,477 @@
+"""In-memory caseload container with lookup indexes."""
+import numpy as np
+import pandas as pd
+
+from models import Client, clients_from_records
+from rates import RateTable, repriced_rates
+
+# Fields a billing-system sync is allowed to overwrite. Names and notes are left alone, and rates too unless
+# the import carries them (see Caseload.upsert).
+FINANCIAL_FIELDS = ("level", "rate", "budget", "balance", "plan_end", "hours")
+SYNCED_FIELDS = tuple(f for f in FINANCIAL_FIELDS if f != "rate")
+NUMERIC_FIELDS = ("rate", "budget", "balance", "hours")
+TEXT_FIELDS = ("id", "name", "ndis_number", "notes")
+NAT = np.datetime64("NaT", "D")
+# Tombstoned rows are only compacted away once there are this many and they make up half the columns
+COMPACT_MIN_DEAD = 1024
+# Ids remembered for changed_since(); past this, callers are told to rebuild instead
+CHANGE_LOG_SIZE = 1000
+
+def normalise_ndis(value):
+    """NDIS numbers are compared as trimmed strings; blanks never match anything."""
+    if value is None:
+        return ""
+    return str(value).strip()
+
+class Caseload:
+    """Client records held as columns (struct of arrays), indexed by id, NDIS number and name.
+
+    Money and hours are float64 arrays, plan_end is datetime64[D] (NaT when
+    absent), level is an int16 code into an interned list of levels and the
+    strings sit in object arrays. frame() hands the live rows to pandas
+    without building a per-record object; get() and iteration materialise
+    Client snapshots, so change a record through update(), set_notes() or
+    upsert() rather than by mutating what they return.
+
+    Record dicts (backups, store rows) are validated into Clients as they
+    are added, so Client.from_dict's ValueError surfaces here. Lookups and
+    deletes are O(1); deleted rows are tombstoned and compacted in bulk.
+    version changes on every write and financial_version only on writes
+    that can change metrics, so caches can key on them, and changed_since()
+    names the records behind recent financial writes for indexes that
+    update incrementally.
+
+    rate_table holds the effective-dated prices metrics bill against; it
+    is saved to the store alongside the records.
+
+    With a store attached, every mutation writes just the affected rows
+    through to it. Construction itself never writes.
+    """
+
+    def __init__(self, records=(), store=None, rate_table=None):
+        self._cols = {}
+        self._capacity = 0
+        self._size = 0  # rows in use, tombstones included
+        self._dead = 0
+        self._levels = []  # interned level names; the level column holds indexes into this
+        self._level_codes = {}
+        self._row = {}  # id -> row, in insertion order
+        self._by_ndis = {}
+        self._by_name = {}
+        self._store = None
+        self._token = object()
+        self.version = 0
+        self.financial_version = 0
+        self._changed = {}  # id -> financial_version of its last financial write
+        self._changed_floor = 0  # changed_since() can't answer for versions before this
+        self.load_errors = []
+        if rate_table is None:
+            rate_table = RateTable.from_records(store.load_rates()) if store is not None else RateTable()
+        self.rate_table = rate_table
+        self._allocate(0)
+        self.extend(records)
+        self._store = store
+
+    @classmethod
+    def from_store(cls, store):
+        """Loads the startup projection (no notes); notes are read on demand.
+
+        Rows that no longer validate are left in the store untouched and listed in load_errors.
+        """
+        clients, errors = clients_from_records(store.load_projection())
+        caseload = cls(clients, store=store)
+        caseload.load_errors = errors
+        return caseload
+
+    @classmethod
+    def restore(cls, records, store=None, rate_table=None):
+        """Replaces everything, including the store's contents, with a backup. Backups carry no prices, so pass the table to keep."""
+        caseload = cls(records, store=store, rate_table=rate_table)
+        if store is not None:
+            store.replace_all(caseload.to_list())
+        return caseload
+
+    # --- COLUMN STORAGE ---
+    def _allocate(self, capacity):
+        old, n = self._cols, self._size
+        cols = {f: np.zeros(capacity) for f in NUMERIC_FIELDS}
+        cols["plan_end"] = np.full(capacity, NAT)
+        cols["level"] = np.zeros(capacity, dtype=np.int16)
+        cols["exited"] = np.zeros(capacity, dtype=bool)
+        cols["alive"] = np.zeros(capacity, dtype=bool)
+        for f in TEXT_FIELDS:
+            cols[f] = np.empty(capacity, dtype=object)
+        for f, col in old.items():
+            cols[f][:n] = col[:n]
+        self._cols, self._capacity = cols, capacity
+
+    def _reserve(self, extra):
+        if self._size + extra > self._capacity:
+            self._allocate(max(self._size + extra, 2 * self._capacity, 1024))
+
+    def _level_code(self, level):
+        code = self._level_codes.get(level)
+        if code is None:
+            code = self._level_codes[level] = len(self._levels)
+            self._levels.append(level)
+        return code
+
+    def _write(self, row, c):
+        cols = self._cols
+        for f in TEXT_FIELDS:
+            cols[f][row] = getattr(c, f)
+        for f in NUMERIC_FIELDS:
+            cols[f][row] = getattr(c, f)
+        cols["plan_end"][row] = NAT if c.plan_end is None else np.datetime64(c.plan_end, "D")
+        cols["level"][row] = self._level_code(c.level)
+        cols["exited"][row] = c.exited
+        cols["alive"][row] = True
+
+    def _client(self, row):
+        cols = self._cols
+        plan_end = cols["plan_end"][row]
+        return Client(cols["id"][row], cols["name"][row], cols["ndis_number"][row], self._levels[cols["level"][row]],
+                      float(cols["rate"][row]), float(cols["budget"][row]), float(cols["balance"][row]),
+                      None if np.isnat(plan_end) else plan_end.astype(object), float(cols["hours"][row]),
+                      cols["notes"][row], bool(cols["exited"][row]))
+
+    def _live_rows(self):
+        return np.flatnonzero(self._cols["alive"][:self._size])
+
+    def _compact(self):
+        keep = self._live_rows()
+        for f, col in self._cols.items():
+            self._cols[f][:len(keep)] = col[keep]
+            self._cols[f][len(keep):self._size] = NAT if f == "plan_end" else (None if col.dtype == object else 0)
+        self._size, self._dead = len(keep), 0
+        self._row = dict(zip(self._cols["id"][:self._size].tolist(), range(self._size)))
+
+    def _touch(self, financial, ids=(), every_row=False):
+        self.version += 1
+        if financial:
+            self.financial_version += 1
+            # A change reaching every record (or more than the log holds) makes changed_since() send callers to a rebuild
+            if every_row or len(ids) > CHANGE_LOG_SIZE:
+                self._changed.clear()
+                self._changed_floor = self.financial_version
+                return
+            if len(self._changed) + len(ids) > CHANGE_LOG_SIZE:
+                # Full: start the log over from this write, which still answers for the version just before it
+                self._changed.clear()
+                self._changed_floor = self.financial_version - 1
+            self._changed.update(dict.fromkeys(ids, self.financial_version))
+
+    def changed_since(self, financial_version):
+        """Ids whose financial fields were written after financial_version, or None if that is too far back to say."""
+        if financial_version < self._changed_floor or financial_version > self.financial_version:
+            return None
+        return [i for i, v in self._changed.items() if v > financial_version]
+
+    @property
+    def metrics_key(self):
+        """Changes whenever anything a metrics computation reads could have changed."""
+        return (self._token, self.financial_version)
+
+    def frame(self, active=True):
+        """Live rows as a typed DataFrame indexed by row number, built straight from the columns.
+
+        With active, participants marked exited by a sync are left out.
+        """
+        cols, n = self._cols, self._size
+        mask = cols["alive"][:n] & ~cols["exited"][:n] if active else cols["alive"][:n]
+        rows = np.flatnonzero(mask)
+        notes = pd.Series(cols["notes"][rows], index=rows, dtype=object)
+        return pd.DataFrame({
+            "id": cols["id"][rows], "name": cols["name"][rows], "ndis_number": cols["ndis_number"][rows],
+            "level": pd.Categorical.from_codes(cols["level"][rows], categories=self._levels),
+            "rate": cols["rate"][rows], "budget": cols["budget"][rows], "balance": cols["balance"][rows],
+            "plan_end": cols["plan_end"][rows], "hours": cols["hours"][rows],
+            "notes": notes.where(notes.notna(), ''), "exited": cols["exited"][rows],
+        }, index=rows)
+
+    # --- RECORD ACCESS ---
+    def __len__(self):
+        return len(self._row)
+
+    def __iter__(self):
+        return (self._client(row) for row in self._live_rows())
+
+    def __contains__(self, client_id):
+        return client_id in self._row
+
+    def to_list(self):
+        return list(self)
+
+    def to_records(self):
+        return [c.to_dict() for c in self]
+
+    def active(self):
+        """Records not marked as exited by a sync."""
+        return [c for c in self if not c.exited]
+
+    def _index(self, client_id, name, ndis_number):
+        ndis = normalise_ndis(ndis_number)
+        # Neither names nor NDIS numbers are guaranteed unique; keep an insertion-ordered set of ids per key
+        if ndis:
+            self._by_ndis.setdefault(ndis, {})[client_id] = None
+        self._by_name.setdefault(name, {})[client_id] = None
+
+    def _unindex(self, row):
+        cols = self._cols
+        client_id, name = cols["id"][row], cols["name"][row]
+        ndis = normalise_ndis(cols["ndis_number"][row])
+        for index, key in ((self._by_ndis, ndis), (self._by_name, name)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.pop(client_id, None)
+                if not ids:
+                    del index[key]
+
+    def _add(self, record):
+        if not isinstance(record, Client):
+            record = Client.from_dict(record)
+        row = self._row.get(record.id)
+        if row is None:
+            self._reserve(1)
+            row = self._row[record.id] = self._size
+            self._size += 1
+        else:
+            self._unindex(row)
+        self._write(row, record)
+        self._index(record.id, record.name, record.ndis_number)
+        return record
+
+    def _persist(self, records):
+        if self._store is not None and records:
+            self._store.save(records)
+
+    def append(self, record):
+        record = self._add(record)
+        self._touch(financial=True, ids=[record.id])
+        self._persist([record])
+        return record
+
+    def extend(self, records):
+        clients = [r if isinstance(r, Client) else Client.from_dict(r) for r in records]
+        if not clients:
+            return
+        ids = [c.id for c in clients]
+        if len(set(ids)) == len(ids) and not any(i in self._row for i in ids):
+            # All new: write each column as one slice instead of row by row
+            self._reserve(len(clients))
+            start, end = self._size, self._size + len(clients)
+            cols = self._cols
+            for f in TEXT_FIELDS + NUMERIC_FIELDS:
+                cols[f][start:end] = [getattr(c, f) for c in clients]
+            cols["plan_end"][start:end] = np.array([c.plan_end for c in clients], dtype="datetime64[D]")
+            cols["level"][start:end] = [self._level_code(c.level) for c in clients]
+            cols["exited"][start:end] = [c.exited for c in clients]
+            cols["alive"][start:end] = True
+            self._size = end
+            for row, c in enumerate(clients, start):
+                self._row[c.id] = row
+                self._index(c.id, c.name, c.ndis_number)
+        else:
+            for c in clients:
+                self._add(c)
+        self._touch(financial=True, ids=ids)
+        self._persist(clients)
+
+    def get(self, client_id):
+        row = self._row.get(client_id)
+        return None if row is None else self._client(row)
+
+    def update(self, client_id, **fields):
+        """Changes fields of one record in place (validated as at ingest). Returns the updated Client."""
+        row = self._row[client_id]
+        current = self._client(row)
+        record = {**current.to_dict(), **fields, "id": client_id}
+        if current.notes is None and "notes" not in fields:
+            record.pop("notes", None)
+        updated = Client.from_dict(record)
+        self._unindex(row)
+        self._write(row, updated)
+        self._index(updated.id, updated.name, updated.ndis_number)
+        self._touch(financial=any(f in FINANCIAL_FIELDS or f == "exited" for f in fields), ids=[client_id])
+        self._persist([updated])
+        return updated
+
+    def remove(self, client_id):
+        """Deletes a record by id. Returns the removed record, or None."""
+        row = self._row.pop(client_id, None)
+        if row is None:
+            return None
+        record = self._client(row)
+        self._unindex(row)
+        self._cols["alive"][row] = False
+        for f in TEXT_FIELDS:
+            self._cols[f][row] = None
+        self._dead += 1
+        compact = self._dead >= COMPACT_MIN_DEAD and self._dead * 2 >= self._size
+        if compact:
+            self._compact()
+        # Compacting renumbers rows, so anything keyed on row numbers has to rebuild
+        self._touch(financial=True, ids=[client_id], every_row=compact)
+        if self._store is not None:
+            self._store.delete(client_id)
+        return record
+
+    def notes(self, client_id):
+        """A record's notes, fetched from the store the first time if it was loaded as a projection."""
+        row = self._row[client_id]
+        notes = self._cols["notes"]
+        if notes[row] is None:
+            notes[row] = self._store.get_notes(client_id) if self._store is not None else ''
+        return notes[row]
+
+    def set_notes(self, client_id, notes):
+        self._cols["notes"][self._row[client_id]] = notes
+        self._touch(financial=False)
+        if self._store is not None:
+            self._store.set_notes(client_id, notes)
+
+    def load_notes(self):
+        """Fills in every missing note with one query, e.g. before building a report. Returns how many were filled."""
+        if self._store is None:
+            return 0
+        rows = self._live_rows()
+        notes, ids = self._cols["notes"], self._cols["id"]
+        missing = rows[np.equal(notes[rows], None)]
+        if len(missing):
+            stored = self._store.load_notes()
+            for row in missing:
+                notes[row] = stored.get(ids[row], '')
+            self._touch(financial=False)
+        return len(missing)
+
+    def apply_claims(self, client_ids, amounts):
+        """Takes claimed amounts off balances in one pass; ids may repeat. Returns the ids touched."""
+        rows = np.fromiter((self._row[i] for i in client_ids), dtype=np.int64, count=len(client_ids))
+        np.subtract.at(self._cols["balance"], rows, np.asarray(amounts, dtype=float))
+        touched = np.unique(rows)
+        ids = self._cols["id"][touched].tolist()
+        if ids:
+            self._touch(financial=True, ids=ids)
+            self._persist([self._client(row) for row in touched])
+        return ids
+
+    def set_rate_table(self, table):
+        """Adopts a new price table. Records keep their rates until reprice() is called."""
+        self.rate_table = table
+        # Every participant's projection can move with the table, not just those whose rate is repriced
+        self._touch(financial=True, every_row=True)
+        if self._store is not None:
+            self._store.replace_rates(table.to_records())
+
+    def reprice(self, day=None):
+        """Moves every guide-priced record to the rate_table prices in force on day (today by default), in one pass.
+
+        Negotiated rates are left alone. Returns the ids whose rate changed.
+        """
+        rows = self._live_rows()
+        rates = self._cols["rate"]
+        levels = np.asarray(self._levels, dtype=object)[self._cols["level"][rows]]
+        new = repriced_rates(levels, rates[rows], self.rate_table, day)
+        moved = new != rates[rows]
+        changed = rows[moved]
+        rates[changed] = new[moved]
+        ids = self._cols["id"][changed].tolist()
+        if ids:
+            self._touch(financial=True, ids=ids)
+            self._persist([self._client(row) for row in changed])
+        return ids
+
+    def stale_rates(self, day=None):
+        """How many guide-priced records aren't on the prices in force on day, e.g. after a July price change."""
+        rows = self._live_rows()
+        levels = np.asarray(self._levels, dtype=object)[self._cols["level"][rows]]
+        current = self._cols["rate"][rows]
+        return int((repriced_rates(levels, current, self.rate_table, day) != current).sum())
+
+    def _id_for_ndis(self, ndis):
+        # Where records share a number, the most recently written one answers for it
+        ids = self._by_ndis.get(ndis)
+        return next(reversed(ids)) if ids else None
+
+    def find_by_ndis(self, ndis_number):
+        client_id = self._id_for_ndis(normalise_ndis(ndis_number))
+        return self.get(client_id) if client_id else None
+
+    def ids_for_ndis(self, ndis_numbers):
+        """Ids for many NDIS numbers at once, None where there is no match."""
+        return [self._id_for_ndis(normalise_ndis(n)) for n in ndis_numbers]
+
+    def ids_for_name(self, name):
+        return list(self._by_name.get(name, ()))
+
+    def label(self, client_id):
+        """Display name, disambiguated with the NDIS number when the name is shared."""
+        row = self._row.get(client_id)
+        if row is None:
+            return ""
+        name = self._cols["name"][row]
+        if len(self._by_name.get(name, ())) > 1:
+            return f"{name} · {self._cols['ndis_number'][row] or client_id[:8]}"
+        return name
+
+    def upsert(self, new_clients, mark_missing_exited=False, sync_rates=False):
+        """Merges imported records into the caseload keyed on NDIS number.
+
+        Matching participants get their financial fields updated in place
+        (keeping id, name and notes); unknown or blank NDIS numbers are
+        inserted. Rates are only taken from the import with sync_rates (the
+        import really carries rates) or when a participant changes level, so
+        negotiated rates survive a CSV sync that prices rows from the guide.
+        With mark_missing_exited, indexed participants absent from this
+        import are flagged 'exited'. Returns a diff summary:
+        {"inserted": [...], "updated": [...], "unchanged": int, "exited": [...]}.
+        """
+        summary = {"inserted": [], "updated": [], "unchanged": 0, "exited": []}
+        seen = set()
+        changed = []
+        for new in new_clients:
+            if not isinstance(new, Client):
+                new = Client.from_dict(new)
+            ndis = normalise_ndis(new.ndis_number)
+            current = self.find_by_ndis(ndis) if ndis else None
+            if ndis:
+                seen.add(ndis)
+            if current is None:
+                self._add(new)
+                changed.append(new)
+                summary["inserted"].append(_describe(new))
+                continue
+
+            # Both sides are typed Clients, so a '2025-06-30' string never differs from the same date
+            fields = FINANCIAL_FIELDS if sync_rates or current.level != new.level else SYNCED_FIELDS
+            changes = {f: (getattr(current, f), getattr(new, f)) for f in fields if getattr(current, f) != getattr(new, f)}
+            if current.exited:
+                changes['exited'] = (True, False)
+            if not changes:
+                summary["unchanged"] += 1
+                continue
+            for field, (_, value) in changes.items():
+                setattr(current, field, value)
+            self._write(self._row[current.id], current)
+            changed.append(current)
+            summary["updated"].append({**_describe(current), "changes": changes})
+
+        if mark_missing_exited:
+            exited = self._cols["exited"]
+            for ndis, ids in self._by_ndis.items():
+                if ndis in seen:
+                    continue
+                for client_id in ids:
+                    row = self._row[client_id]
+                    if not exited[row]:
+                        exited[row] = True
+                        record = self._client(row)
+                        changed.append(record)
+                        summary["exited"].append(_describe(record))
+        if changed:
+            self._touch(financial=True, ids=[c.id for c in changed])
+        self._persist(changed)
+        return summary
+
+def _describe(record):
+    return {"id": record.id, "name": record.name, "ndis_number": record.ndis_number}
@@ -0,0 +1,612 @@
+"""The dashboard both entry points share: session state, sidebar, overview and the participant vault.
+
+app.py and streamlit_app.py keep only their page config, styling and
+zero-state screen. The participant vault, its trajectory chart and the
+notes editor are st.fragment functions, so picking a participant, typing
+a note or changing the chart reruns just that fragment (one participant's
+worth of work) instead of the whole script. Anything that changes the
+caseload's financials still calls st.rerun() so the overview catches up.
+"""
+import streamlit as st
+import pandas as pd
+import json
+import os
+import datetime
+from datetime import timedelta
+import uuid
+import perf
+from utils import MetricsCache, calculate_client_metrics, generate_caseload_report, report_fingerprint, generate_csv_template, import_csv, filter_participants, participant_page, reprice_preview, STATUS_COLORS, PLAN_END_WINDOWS, SORT_COLUMNS
+from caseload import Caseload
+from projection import project_portfolio, portfolio_totals
+from depletion import DepletionIndex
+from simulation import SimulationCache
+from ledger import ClaimsLedger, generate_claims_template, TRAILING_WEEKS
+from snapshots import SnapshotHistory, SPARKLINE_DAYS
+from ai_notes import GeminiBackend, FakeBackend, NoteCache, NoteGenerator, note_prompt, REVIEW_STATUSES, DEFAULT_CONCURRENCY, DEFAULT_REQUESTS_PER_MINUTE
+from models import Client, clients_from_records
+from store import CaseloadStore
+from backup import parquet_available, write_backup, read_backup, frame_to_records
+
+# The vault picker lists at most this many search matches, so switching participant never scales with the caseload
+VAULT_PICKER_LIMIT = 200
+
+# ==============================================================================
+# 1. RESOURCES & SESSION
+# ==============================================================================
+@st.cache_resource
+def caseload_store(path):
+    return CaseloadStore(path)
+
+def open_store():
+    """Optional local SQLite persistence (CASELOAD_DB); without it the caseload lives only in this session."""
+    path = os.environ.get("CASELOAD_DB")
+    return caseload_store(path) if path else None
+
+@st.cache_resource
+def note_generator(api_key):
+    """One generator per key, so the model client is configured once and the rate limit is shared. NOTES_BACKEND=fake works offline."""
+    backend = FakeBackend(latency=0.5) if os.environ.get("NOTES_BACKEND") == "fake" else GeminiBackend(api_key)
+    return NoteGenerator(backend, NoteCache(open_store()))
+
+def backup_data(compact):
+    """Backup file contents (JSON text or Parquet bytes), built again only after the caseload changes.
+
+    With a store the records are exported from SQLite, which also holds notes not loaded yet.
+    """
+    caseload = st.session_state.caseload
+    key = (caseload.metrics_key[0], caseload.version, compact)
+    if st.session_state.get('backup_key') == key:
+        return st.session_state.backup_data
+    store = open_store()
+    records = store.export_records() if store is not None else caseload.to_records()
+    data = write_backup(records) if compact else json.dumps(records, default=str)
+    st.session_state.backup_key, st.session_state.backup_data = key, data
+    return data
+
+def init_session():
+    """Session defaults, then starts timing this run. Call first thing after st.set_page_config."""
+    store = open_store()
+    if 'caseload' not in st.session_state:
+        st.session_state.caseload = Caseload.from_store(store) if store else Caseload()
+    if 'metrics_cache' not in st.session_state:
+        st.session_state.metrics_cache = MetricsCache()
+    if 'depletion_index' not in st.session_state:
+        st.session_state.depletion_index = DepletionIndex()
+    if 'ledger' not in st.session_state:
+        st.session_state.ledger = ClaimsLedger(store)
+    if 'history' not in st.session_state:
+        st.session_state.history = SnapshotHistory(store)
+    if 'sim_cache' not in st.session_state:
+        st.session_state.sim_cache = SimulationCache()
+    if 'perf' not in st.session_state:
+        # Recent rerun timings for the sidebar panel; PERF_LOG=path also appends each run there as JSON lines
+        st.session_state.perf = perf.PerfHistory(log_path=os.environ.get("PERF_LOG"))
+    perf.start_run(st.session_state.perf, st.session_state.get('perf_enabled', False))
+
+def show_perf_panel(panel):
+    """Ends this rerun's timing and shows the last few runs in the sidebar panel."""
+    if perf.finish_run(st.session_state.perf) is None:
+        return
+    table = pd.DataFrame.from_dict(st.session_state.perf.table(), orient='index')
+    table = table[table.columns[::-1]].round(1)
+    table.columns = ["now"] + [f"-{k}" for k in range(1, len(table.columns))]
+    stats = st.session_state.metrics_cache.stats()
+    with panel.container():
+        st.dataframe(table, use_container_width=True)
+        st.caption(f"ms per stage, newest run first (fragment reruns are listed as their own runs). Metrics cache: {stats['hits']:,} reused / {stats['updates']:,} updated / {stats['rebuilds']:,} rebuilt, {stats['rows_computed']:,} rows computed, {stats['size']:,} rows held.")
+
+def fragment_timing(name):
+    """perf.fragment() against this session's history."""
+    return perf.fragment(st.session_state.perf, name, st.session_state.get('perf_enabled', False))
+
+# ==============================================================================
+# 2. SIDEBAR
+# ==============================================================================
+def render_sidebar(version):
+    """The whole sidebar. Returns {"api_key", "ai_ready", "perf_panel"} for the rest of the page."""
+    with st.sidebar, perf.stage("sidebar"):
+        st.markdown(f"<div style='text-align:center; padding:15px 0;'><h1 style='margin:0; font-size:40px;'>🛡️</h1><h3 style='margin:0; color:white; letter-spacing:2px;'>XYSTON</h3><p style='color:#8b949e; font-size:10px; letter-spacing:1px;'>CASELOAD MASTER {version}</p></div>", unsafe_allow_html=True)
+
+        api_key = st.secrets.get("GEMINI_API_KEY", None)
+        if not api_key:
+            with st.expander("🔐 AI Settings"):
+                api_key = st.text_input("Google API Key", type="password")
+        ai_ready = bool(api_key) or os.environ.get("NOTES_BACKEND") == "fake"
+
+        # DATA TOOLS
+        with st.expander("📂 Import / Export", expanded=True):
+            tab_json, tab_csv, tab_claims = st.tabs(["Backup", "Bulk Import", "Claims"])
+            with tab_json:
+                if st.session_state.caseload:
+                    compact = parquet_available() and st.checkbox("Compact format (.parquet)")
+                    if compact:
+                        st.download_button("💾 Save Database", backup_data(True), "caseload_backup.parquet", "application/vnd.apache.parquet", use_container_width=True)
+                    else:
+                        st.download_button("💾 Save Database", backup_data(False), "caseload_backup.json", "application/json", use_container_width=True)
+                uploaded_json = st.file_uploader("Load Backup", type=['json', 'parquet'] if parquet_available() else ['json'], label_visibility="collapsed", key="json_up")
+                # The uploader keeps its file across reruns; restore each upload only once
+                if uploaded_json and st.session_state.get('restored_file') != (uploaded_json.name, uploaded_json.size):
+                    try:
+                        if uploaded_json.name.endswith('.parquet'):
+                            records = frame_to_records(read_backup(uploaded_json.getvalue()))
+                        else:
+                            records = json.load(uploaded_json)
+                        clients, st.session_state.restore_errors = clients_from_records(records)
+                        st.session_state.caseload = Caseload.restore(clients, store=open_store(), rate_table=st.session_state.caseload.rate_table)
+                        st.session_state.restored_file = (uploaded_json.name, uploaded_json.size)
+                        st.success(f"Loaded {len(st.session_state.caseload)} clients!")
+                        # No rerun loop
+                    except: st.error("Error loading JSON")
+                if st.session_state.get('restore_errors'):
+                    st.warning(f"{len(st.session_state.restore_errors)} record(s) in the backup were invalid and skipped.")
+                    st.dataframe(pd.DataFrame(st.session_state.restore_errors), hide_index=True, use_container_width=True, height=150)
+
+            with tab_csv:
+                csv_template = generate_csv_template()
+                st.download_button("📄 Get CSV Template", csv_template, "client_template.csv", "text/csv", use_container_width=True)
+
+                with st.form("csv_upload_form", clear_on_submit=True):
+                    uploaded_csv = st.file_uploader("Import CSV", type=['csv'], label_visibility="collapsed")
+                    import_mode = st.radio("Mode", ["Add as new", "Sync by NDIS #"], horizontal=True, label_visibility="collapsed")
+                    mark_exited = st.checkbox("Mark participants missing from file as exited", disabled=import_mode == "Add as new")
+                    submitted = st.form_submit_button("Import Data")
+                    if submitted and uploaded_csv:
+                        new_data, import_errors = import_csv(uploaded_csv, rates=st.session_state.caseload.rate_table.rates_on())
+                        # Kept in session so the row report survives the rerun below
+                        st.session_state.csv_report = {"imported": len(new_data), "errors": import_errors, "sync": None}
+                        if new_data:
+                            if import_mode == "Sync by NDIS #":
+                                st.session_state.csv_report["sync"] = st.session_state.caseload.upsert(new_data, mark_missing_exited=mark_exited)
+                            else:
+                                st.session_state.caseload.extend(new_data)
+                            st.rerun()
+
+                csv_report = st.session_state.get('csv_report')
+                if csv_report:
+                    sync = csv_report.get('sync')
+                    if sync:
+                        st.success(f"Synced: {len(sync['inserted'])} new, {len(sync['updated'])} updated, {sync['unchanged']} unchanged, {len(sync['exited'])} exited.")
+                        if sync['updated']:
+                            changes = [{"Name": u['name'], "NDIS #": u['ndis_number'], "Field": field, "Was": old, "Now": new}
+                                       for u in sync['updated'] for field, (old, new) in u['changes'].items()]
+                            st.dataframe(pd.DataFrame(changes).astype(str), hide_index=True, use_container_width=True, height=150)
+                    elif csv_report['imported']: st.success(f"Imported {csv_report['imported']} clients!")
+                    else: st.error("Format Error. Use the template.")
+                    if csv_report['errors']:
+                        st.warning(f"{len(csv_report['errors'])} problem(s) found. Affected rows were skipped.")
+                        st.dataframe(pd.DataFrame(csv_report['errors']), hide_index=True, use_container_width=True, height=150)
+
+            with tab_claims:
+                st.download_button("📄 Get Claims Template", generate_claims_template(), "claims_template.csv", "text/csv", use_container_width=True)
+                with st.form("claims_upload_form", clear_on_submit=True):
+                    uploaded_claims = st.file_uploader("Import Claims", type=['csv'], label_visibility="collapsed")
+                    if st.form_submit_button("Import Claims") and uploaded_claims:
+                        # Streamed in chunks; balances and actual burn are updated as each chunk lands
+                        recorded, claim_errors = st.session_state.ledger.import_csv(st.session_state.caseload, uploaded_claims)
+                        st.session_state.claims_report = {"recorded": recorded, "errors": claim_errors}
+                        st.rerun()
+                claims_report = st.session_state.get('claims_report')
+                if claims_report:
+                    st.success(f"Recorded {claims_report['recorded']:,} claims.")
+                    if claims_report['errors']:
+                        st.warning(f"{len(claims_report['errors'])} problem(s) found. Affected rows were skipped.")
+                        st.dataframe(pd.DataFrame(claims_report['errors']), hide_index=True, use_container_width=True, height=150)
+                st.toggle("Plan on actual burn", key="use_actual_burn", help=f"Use each participant's average claimed $/week over the last {TRAILING_WEEKS} weeks instead of hours x rate, where they have claims.")
+
+        # ADD CLIENT
+        with st.expander("➕ Add Single Client", expanded=False):
+            with st.form("add_form"):
+                name = st.text_input("Name")
+                ndis = st.text_input("NDIS #")
+                current_rates = st.session_state.caseload.rate_table.rates_on()
+                level = st.selectbox("Level", list(current_rates))
+                budget = st.number_input("Total Budget", 18000.0)
+                balance = st.number_input("Current Balance", 15000.0)
+                end = st.date_input("Plan End")
+                hours = st.number_input("Hours/Week", 1.5, step=0.1)
+                if st.form_submit_button("Create Record", type="primary"):
+                    new_c = Client.from_dict({"id": str(uuid.uuid4()), "name": name, "ndis_number": ndis, "level": level, "rate": current_rates[level], "budget": budget, "balance": balance, "plan_end": end, "hours": hours, "notes": ""})
+                    st.session_state.caseload.append(new_c)
+                    st.rerun()
+
+        # PRICE TABLES
+        with st.expander("💲 Price Tables"):
+            rate_table = st.session_state.caseload.rate_table
+            st.dataframe(pd.DataFrame({d.strftime("%d %b %Y"): r for d, r in rate_table.versions}).T, use_container_width=True)
+            stale = st.session_state.caseload.stale_rates()
+            if stale:
+                st.warning(f"{stale:,} participant(s) are still on superseded prices.")
+                if st.button("Reprice to Current Prices", use_container_width=True):
+                    st.session_state.caseload.reprice()
+                    st.rerun()
+            with st.form("rates_form"):
+                today = datetime.date.today()
+                effective = st.date_input("Effective From", datetime.date(today.year + (today.month >= 7), 7, 1))
+                base = rate_table.rates_on(effective)
+                new_rates = {level: st.number_input(level, value=base.get(level, 0.0), step=0.01, format="%.2f") for level in rate_table.levels()}
+                if st.form_submit_button("Preview Impact"):
+                    st.session_state.rate_candidate = rate_table.with_version(effective, new_rates)
+            candidate = st.session_state.get('rate_candidate')
+            if candidate is not None:
+                with perf.stage("reprice preview"):
+                    # Two metrics passes over the caseload, so keep the result until something changes
+                    preview_key = (candidate, st.session_state.caseload.metrics_key, datetime.date.today())
+                    if st.session_state.get('rate_preview_key') != preview_key:
+                        st.session_state.rate_preview = reprice_preview(st.session_state.caseload, candidate)
+                        st.session_state.rate_preview_key = preview_key
+                    summary, changes = st.session_state.rate_preview
+                st.caption(f"{summary['repriced']:,} repriced now • {summary['affected']:,} affected • surplus {summary['surplus_change']:+,.0f} • {summary['status_changes']:,} status change(s)")
+                if len(changes):
+                    shown = changes[['name', 'old_rate', 'new_rate', 'surplus_change']].head(100)
+                    shown.columns = ['Name', 'Old Rate', 'New Rate', 'Surplus Δ']
+                    st.dataframe(shown.style.format({'Old Rate': "${:,.2f}", 'New Rate': "${:,.2f}", 'Surplus Δ': "${:+,.0f}"}), use_container_width=True, hide_index=True, height=200)
+                c_apply, c_discard = st.columns(2)
+                if c_apply.button("Apply", type="primary", use_container_width=True):
+                    st.session_state.caseload.set_rate_table(candidate)
+                    st.session_state.caseload.reprice()
+                    del st.session_state.rate_candidate
+                    st.rerun()
+                if c_discard.button("Discard", use_container_width=True):
+                    del st.session_state.rate_candidate
+                    st.rerun()
+
+        # PERFORMANCE
+        with st.expander("⏱️ Performance"):
+            st.checkbox("Time each rerun", key="perf_enabled")
+            perf_panel = st.empty()
+
+        # COMMAND CENTRE
+        st.markdown("---")
+        st.caption("COMMAND CENTRE")
+
+        with st.expander("⚡ Admin & Banking"):
+            st.markdown("""
+            <div class="link-row">
+                <a href="https://secure.employmenthero.com/login" target="_blank">👤 Employment Hero HR</a>
+                <a href="https://login.xero.com/" target="_blank">📊 Xero Accounting</a>
+                <hr style="border-color:#333; margin:5px 0;">
+                <a href="https://www.commbank.com.au/" target="_blank">🏦 Commonwealth Bank</a>
+                <a href="https://www.westpac.com.au/" target="_blank">🏦 Westpac</a>
+                <a href="https://www.anz.com.au/" target="_blank">🏦 ANZ</a>
+                <a href="https://www.nab.com.au/" target="_blank">🏦 NAB</a>
+            </div>
+            """, unsafe_allow_html=True)
+
+        with st.expander("🏛️ NDIS Compliance"):
+            st.markdown("""
+            <div class="link-row">
+                <a href="https://proda.humanservices.gov.au/" target="_blank">🔐 PACE / PRODA Login</a>
+                <a href="https://www.ndis.gov.au/providers/pricing-arrangements" target="_blank">💰 Pricing Arrangements</a>
+                <a href="https://ourguidelines.ndis.gov.au/" target="_blank">📜 Operational Guidelines</a>
+                <a href="https://www.legislation.gov.au/Details/C2013A00020" target="_blank">⚖️ NDIS Act 2013</a>
+                <a href="https://www.ndiscommission.gov.au/" target="_blank">🛡️ NDIS Commission</a>
+                <a href="https://www.ndis.gov.au/news" target="_blank">📰 News & Reviews</a>
+            </div>
+            """, unsafe_allow_html=True)
+
+        st.markdown("---")
+        st.markdown('<div style="text-align:center"><a href="https://www.buymeacoffee.com/h0m1ez187" target="_blank"><img src="https://cdn.buymeacoffee.com/buttons/v2/default-yellow.png" style="width:160px;"></a></div>', unsafe_allow_html=True)
+
+    return {"api_key": api_key, "ai_ready": ai_ready, "perf_panel": perf_panel}
+
+# ==============================================================================
+# 3. ACTIVE DASHBOARD (DATA LOADED)
+# ==============================================================================
+def render_dashboard(sidebar):
+    """Top cards, the overview tab and the participant vault; ends the run's timing."""
+    with perf.stage("metrics"):
+        # With "Plan on actual burn", participants who have claims are planned on what they actually claim
+        ledger = st.session_state.ledger if st.session_state.get('use_actual_burn') else None
+        df = st.session_state.metrics_cache.metrics_for(st.session_state.caseload, ledger)
+        st.session_state.depletion_index.sync(st.session_state.caseload, st.session_state.metrics_cache, ledger)
+        # Today's snapshot, on planned figures; a no-op until something changes or the day rolls over
+        st.session_state.history.capture(st.session_state.caseload, df if ledger is None else None)
+
+    total_funds = df['balance'].sum()
+    monthly_rev = df['weekly_cost'].sum() * 4.33
+    risk_count = len(df[df['status'] == 'CRITICAL SHORTFALL'])
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.markdown(f"<div class='metric-card'><div class='metric-val'>{len(df)}</div><div class='metric-lbl'>Active Participants</div></div>", unsafe_allow_html=True)
+    c2.markdown(f"<div class='metric-card'><div class='metric-val'>${total_funds:,.0f}</div><div class='metric-lbl'>Funds Managed</div></div>", unsafe_allow_html=True)
+    c3.markdown(f"<div class='metric-card'><div class='metric-val'>${monthly_rev:,.0f}</div><div class='metric-lbl'>Est. Monthly Revenue</div></div>", unsafe_allow_html=True)
+    risk_col = "#f85149" if risk_count > 0 else "#238636"
+    c4.markdown(f"<div class='metric-card' style='border-color:{risk_col}'><div class='metric-val' style='color:{risk_col}'>{risk_count}</div><div class='metric-lbl'>Critical Risks</div></div>", unsafe_allow_html=True)
+
+    st.markdown("---")
+
+    tab1, tab2 = st.tabs(["📊 Caseload Overview", "🔍 Participant Vault"])
+    with tab1:
+        caseload_overview(df, ledger, sidebar)
+    with tab2:
+        participant_vault(df, ledger, sidebar)
+
+    show_perf_panel(sidebar["perf_panel"])
+
+def drop_report():
+    """Call after notes change. The report prints notes, so a prepared one is dropped and the whole page
+    redrawn: a fragment rerun would leave its download button offering the old file."""
+    if st.session_state.pop('report_fp', None) is not None:
+        st.session_state.pop('report_doc', None)
+        st.rerun(scope="app")
+
+def caseload_overview(df, ledger, sidebar):
+    c_viz, c_data = st.columns([1, 2])
+    with c_viz:
+        st.markdown("### Viability Radar")
+        if not df.empty:
+            color_map = {"ROBUST SURPLUS": "#3fb950", "SUSTAINABLE": "#2ea043", "MONITORING REQUIRED": "#d29922", "CRITICAL SHORTFALL": "#f85149"}
+            with perf.stage("pie chart"):
+                import plotly.express as px
+                fig = px.pie(df, names='status', color='status', color_discrete_map=color_map, hole=0.6)
+                fig.update_layout(showlegend=False, margin=dict(t=0,b=0,l=0,r=0), height=250, paper_bgcolor='rgba(0,0,0,0)')
+                st.plotly_chart(fig, use_container_width=True)
+
+        with perf.stage("report"):
+            # Report is built on request and reused until the caseload (or the date) changes
+            report_fp = report_fingerprint(df)
+            if st.session_state.get('report_fp') != report_fp:
+                if st.button("📄 Prepare Full Report (.docx)", use_container_width=True, type="primary"):
+                    # Store-backed caseloads start without notes; pull them in before the report needs them
+                    report_df = df
+                    if st.session_state.caseload.load_notes():
+                        report_df = st.session_state.metrics_cache.metrics_for(st.session_state.caseload, ledger)
+                        report_fp = report_fingerprint(report_df)
+                    bar = st.progress(0.0, text="Building report...") if len(report_df) >= 200 else None
+                    on_progress = (lambda done, total: bar.progress(done / total, text=f"Building report... {done}/{total}")) if bar else None
+                    st.session_state.report_doc = generate_caseload_report(report_df, progress=on_progress)
+                    st.session_state.report_fp = report_fp
+                    if bar: bar.empty()
+            if st.session_state.get('report_fp') == report_fp:
+                st.download_button("📄 Download Full Report (.docx)", st.session_state.report_doc, f"Caseload_Report_{datetime.date.today()}.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", use_container_width=True, type="primary")
+
+        with st.expander("🤖 Plan Review Notes"):
+            review = df[df['status'].isin(REVIEW_STATUSES)]
+            st.caption(f"Writes an AI file note for each of the {len(review):,} Critical / Monitoring participants, replacing their current note. Participants whose figures haven't changed reuse their last note.")
+            n_conc, n_rate = st.columns(2)
+            concurrency = n_conc.number_input("Concurrent requests", 1, 32, DEFAULT_CONCURRENCY)
+            per_minute = n_rate.number_input("Requests / minute", 1, 2000, DEFAULT_REQUESTS_PER_MINUTE)
+            if st.button("Generate Notes ✨", use_container_width=True, disabled=review.empty):
+                if sidebar["ai_ready"]:
+                    generator = note_generator(sidebar["api_key"])
+                    generator.configure(concurrency, per_minute)
+                    prompts = {r['id']: note_prompt(r) for r in review.to_dict('records')}
+                    bar = st.progress(0.0, text="Writing notes...")
+                    with perf.stage("batch notes"):
+                        results = generator.generate_batch(prompts, progress=lambda done, total: bar.progress(done / total, text=f"Writing notes... {done}/{total}"))
+                    bar.empty()
+                    for client_id, r in results.items():
+                        if r['note'] is not None:
+                            st.session_state.caseload.set_notes(client_id, r['note'])
+                    st.session_state.batch_notes_report = {
+                        "written": sum(r['note'] is not None for r in results.values()),
+                        "cached": sum(r['cached'] for r in results.values()),
+                        "errors": [{"Name": st.session_state.caseload.label(i), "Error": r['error']} for i, r in results.items() if r['error']],
+                    }
+                    if st.session_state.batch_notes_report["written"]: drop_report()
+                else: st.error("No API Key.")
+            notes_report = st.session_state.get('batch_notes_report')
+            if notes_report:
+                st.success(f"Wrote {notes_report['written']:,} notes ({notes_report['cached']:,} unchanged, from cache).")
+                if notes_report['errors']:
+                    st.warning(f"{len(notes_report['errors'])} participant(s) failed after retries.")
+                    st.dataframe(pd.DataFrame(notes_report['errors']), hide_index=True, use_container_width=True, height=150)
+
+    with c_data:
+        st.markdown("### Participant List")
+        f_search, f_status, f_level = st.columns([2, 2, 2])
+        search = f_search.text_input("Search", placeholder="Name or NDIS #", label_visibility="collapsed")
+        statuses = f_status.multiselect("Health", list(STATUS_COLORS), placeholder="Any health", label_visibility="collapsed")
+        # Levels in the active price table, plus any custom ones participants are on
+        level_options = list(dict.fromkeys([*st.session_state.caseload.rate_table.levels(), *df['level'].unique()]))
+        levels = f_level.multiselect("Level", level_options, placeholder="Any level", label_visibility="collapsed")
+        f_window, f_sort, f_desc, f_size = st.columns([2, 2, 1, 1])
+        window = f_window.selectbox("Plan ends", list(PLAN_END_WINDOWS), label_visibility="collapsed")
+        sort = f_sort.selectbox("Sort by", list(SORT_COLUMNS), format_func=lambda s: f"Sort: {s}", label_visibility="collapsed")
+        descending = f_desc.toggle("Desc")
+        page_size = f_size.selectbox("Rows", [25, 50, 100, 250], index=1, label_visibility="collapsed")
+        simulate = st.toggle("Simulate varying hours", help=f"Runs {st.session_state.sim_cache.trials:,} trials per participant with weekly hours varying around their usual hours, and adds the chance of running short before plan end and when the money runs out in the worst 10% / median of trials.")
+
+        with perf.stage("participant table"):
+            # Filter and sort the whole caseload, but format and style only the page on screen
+            filtered = filter_participants(df, search, statuses, levels, window)
+            # Any change to the query goes back to page 1
+            query = (search, tuple(statuses), tuple(levels), window, sort, descending, page_size)
+            if st.session_state.get('table_query') != query:
+                st.session_state.table_query, st.session_state.table_page = query, 1
+            page_df, page_count = participant_page(filtered, st.session_state.table_page, page_size, sort, descending)
+            # Removing participants can leave the saved page past the end
+            st.session_state.table_page = min(st.session_state.table_page, page_count)
+
+            display_df = page_df[['name', 'plan_end', 'status', 'runway_weeks', 'surplus']]
+            display_df.columns = ['Name', 'End Date', 'Health', 'Runway', 'Outcome']
+            if simulate:
+                with perf.stage("simulation"):
+                    # Only the rows on screen are simulated; results are kept until the financials change
+                    sim = st.session_state.sim_cache.results_for(st.session_state.caseload, page_df)
+                display_df = display_df.assign(**{'Shortfall Risk': sim['shortfall_probability'], 'Runs Out (P10)': sim['depletion_p10'], 'Runs Out (P50)': sim['depletion_p50']})
+            st.dataframe(
+                display_df.style.format({'Outcome': "${:,.0f}", 'Runway': "{:.1f}", 'Shortfall Risk': "{:.0%}"})
+                .map(lambda x: 'color:#f85149; font-weight:bold' if x=='CRITICAL SHORTFALL' else 'color:#3fb950' if x=='ROBUST SURPLUS' else '', subset=['Health']),
+                use_container_width=True, height=400, hide_index=True
+            )
+            p_info, p_num = st.columns([3, 1])
+            first = (st.session_state.table_page - 1) * page_size
+            p_info.caption(f"Showing {first + 1 if len(filtered) else 0:,}–{first + len(page_df):,} of {len(filtered):,} ({len(df):,} active)")
+            p_num.number_input("Page", min_value=1, max_value=page_count, key="table_page", label_visibility="collapsed")
+
+    st.markdown("### Portfolio Projection")
+    c_view, c_horizon = st.columns([3, 1])
+    view = c_view.radio("Projection", ["Funds Remaining", "Weekly Revenue", "Clients Running Out"], horizontal=True, label_visibility="collapsed")
+    horizon = c_horizon.selectbox("Horizon", [13, 26, 52], index=2, format_func=lambda w: f"{w} weeks", label_visibility="collapsed")
+    if not df.empty:
+        with perf.stage("portfolio projection"):
+            import plotly.express as px
+            # Everyone at once, assuming current hours continue at each period's prices; split by support level
+            proj = project_portfolio(df, horizon, rate_table=st.session_state.caseload.rate_table)
+            column = {"Funds Remaining": "funds_remaining", "Weekly Revenue": "revenue", "Clients Running Out": "running_out"}[view]
+            chart = px.bar if column == "running_out" else px.area
+            fig = chart(proj, x="date", y=column, color="level", labels={"date": "Week Starting", column: view, "level": "Support Level"})
+            fig.update_layout(height=350, hovermode="x unified", margin=dict(t=30,b=0,l=0,r=0), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', legend=dict(orientation="h", y=-0.2))
+            st.plotly_chart(fig, use_container_width=True)
+            # Week `horizon` is only there for the closing balance
+            totals = portfolio_totals(proj[proj['week'] < horizon])
+            st.caption(f"Over {horizon} weeks: ${totals['revenue'].sum():,.0f} expected revenue • {int(totals['running_out'].sum()):,} participants run out of funds before their plan ends")
+
+    st.markdown("### Running Out Next")
+    c_within, c_count = st.columns([1, 3])
+    within_days = c_within.selectbox("Within", [14, 30, 60, 90], index=1, format_func=lambda d: f"Next {d} days", label_visibility="collapsed")
+    with perf.stage("depletion alerts"):
+        # Ordered index over depletion dates: a count is a bisect, and only the rows shown are looked up
+        index = st.session_state.depletion_index
+        due = index.count_within(within_days)
+        c_count.markdown(f"**{due:,}** participant{'s' if due != 1 else ''} run out of funds within {within_days} days while their plan is still running")
+        if due:
+            alerts = []
+            for runs_out, client_id in index.next(min(due, 20)):
+                m = calculate_client_metrics(st.session_state.caseload.get(client_id), st.session_state.caseload.rate_table, ledger.trailing_burn(client_id) if ledger else None)
+                alerts.append({"Name": st.session_state.caseload.label(client_id), "Runs Out": runs_out, "Plan Ends": m['plan_end'], "Health": m['status'], "Balance": m['balance']})
+            st.dataframe(pd.DataFrame(alerts).style.format({'Balance': "${:,.0f}"}), use_container_width=True, hide_index=True)
+            if due > 20:
+                st.caption(f"Showing the first 20 of {due:,}")
+
+    st.markdown("### Status Changes This Week")
+    with perf.stage("status changes"):
+        # Read from the snapshot history: only days where a participant's health actually moved are stored
+        changes = st.session_state.history.status_changes(datetime.date.today() - timedelta(days=7))
+        changes = changes[changes['client_id'].map(st.session_state.caseload.__contains__).astype(bool)]
+        if changes.empty:
+            st.caption("No participant has changed health status in the last 7 days.")
+        else:
+            worsened = int(changes['worsened'].sum())
+            st.markdown(f"**{len(changes):,}** change{'s' if len(changes) != 1 else ''} in the last 7 days • **{worsened:,}** worsened")
+            report = pd.DataFrame({"Name": changes['client_id'].map(st.session_state.caseload.label), "Date": changes['day'],
+                                   "From": changes['previous'], "To": changes['status'], "Worsened": changes['worsened']})
+            st.dataframe(report.sort_values("Date", ascending=False), use_container_width=True, hide_index=True)
+
+# ==============================================================================
+# 4. PARTICIPANT VAULT (FRAGMENTS)
+# ==============================================================================
+def vault_choices(df, search):
+    """Ids of the first VAULT_PICKER_LIMIT participants matching the search, kept until the search or the financials change."""
+    key = (search.strip(), st.session_state.caseload.metrics_key)
+    if st.session_state.get('vault_choices_key') != key:
+        st.session_state.vault_choices = filter_participants(df, search)['id'].head(VAULT_PICKER_LIMIT).tolist()
+        st.session_state.vault_choices_key = key
+    return st.session_state.vault_choices
+
+@st.fragment
+def participant_vault(df, ledger, sidebar):
+    """One participant at a time. Reruns on its own: `df` is the frame from the last full run, used only to search."""
+    with fragment_timing("participant vault"):
+        c_sel, c_find, c_act = st.columns([2, 1, 1])
+        search = c_find.text_input("Find Participant", placeholder="Name or NDIS #", key="vault_search", label_visibility="collapsed")
+        choices = vault_choices(df, search)
+        with c_sel:
+            # Keyed on id so participants sharing a name stay distinct
+            selected_id = st.selectbox("Select Participant", choices, format_func=st.session_state.caseload.label, key="vault_selected", label_visibility="collapsed")
+        if len(choices) == VAULT_PICKER_LIMIT:
+            st.caption(f"Listing the first {VAULT_PICKER_LIMIT} matches; search by name or NDIS # to find others.")
+
+        if not selected_id or selected_id not in st.session_state.caseload:
+            return
+        original_rec = st.session_state.caseload.get(selected_id)
+        client_metrics = calculate_client_metrics(original_rec, st.session_state.caseload.rate_table, ledger.trailing_burn(selected_id) if ledger else None)
+
+        with c_act:
+            if st.button("🗑️ Remove Participant"):
+                st.session_state.caseload.remove(client_metrics['id'])
+                st.success("Deleted.")
+                st.rerun()
+
+        st.markdown(f"<div style='background:{client_metrics['color']}10; border-left:5px solid {client_metrics['color']}; padding:15px; border-radius:4px; margin-bottom:20px;'><h2 style='margin:0; color:{client_metrics['color']};'>{client_metrics['status']}</h2><p style='margin:5px 0 0 0; color:#8b949e;'>Plan ends {client_metrics['plan_end'].strftime('%d %b %Y')} • {client_metrics['weeks_remaining']:.1f} wks left</p></div>", unsafe_allow_html=True)
+
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Balance", f"${client_metrics['balance']:,.2f}")
+        m2.metric("Burn", f"${client_metrics['weekly_cost']:,.2f}/wk", f"{client_metrics['hours']}h/wk")
+        m3.metric("Outcome", f"${client_metrics['surplus']:,.0f}", "Surplus" if client_metrics['surplus'] > 0 else "Deficit")
+
+        with perf.stage("trend sparklines"):
+            import plotly.express as px
+            trend = st.session_state.history.series(selected_id)
+            if len(trend) > 1:
+                s1, s2 = st.columns(2)
+                for col, field, label in ((s1, "balance", "Balance"), (s2, "surplus", "Outcome")):
+                    fig = px.line(trend, x="day", y=field, labels={"day": "", field: label})
+                    fig.update_traces(line_color=client_metrics['color'])
+                    fig.update_layout(height=120, margin=dict(t=20,b=0,l=0,r=0), title=dict(text=f"{label}, last {SPARKLINE_DAYS} days", font=dict(size=12)), xaxis_visible=False, yaxis_visible=False, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+                    col.plotly_chart(fig, use_container_width=True)
+                since = trend['day'][trend['status'] != trend['status'].shift()].iloc[-1]
+                st.caption(f"{trend['status'].iloc[-1].title()} since {since.strftime('%d %b %Y')}")
+
+        with st.expander("🧾 Claims"):
+            with st.form("claim_form", clear_on_submit=True):
+                c_date, c_hours, c_amount = st.columns(3)
+                claim_date = c_date.date_input("Date")
+                claim_hours = c_hours.number_input("Hours", 0.0, step=0.25)
+                claim_amount = c_amount.number_input("Amount", 0.0, step=10.0, help="Leave at 0 to bill the hours at the participant's rate")
+                claim_item = st.text_input("Line Item", placeholder="e.g. 07_002_0106_8_3")
+                if st.form_submit_button("Record Claim") and (claim_hours or claim_amount):
+                    st.session_state.ledger.append(st.session_state.caseload, [{"client_id": selected_id, "date": claim_date, "hours": claim_hours, "amount": claim_amount or None, "line_item": claim_item}])
+                    # Balances changed: the whole dashboard reruns, not just the vault
+                    st.rerun()
+            actual = st.session_state.ledger.trailing_burn(selected_id)
+            if actual is not None:
+                st.caption(f"Actual burn over the last {TRAILING_WEEKS} weeks: ${actual:,.2f}/wk (planned ${original_rec.hours * original_rec.rate:,.2f}/wk)")
+                st.dataframe(st.session_state.ledger.history(selected_id, limit=20), use_container_width=True, hide_index=True, height=200)
+
+        st.markdown("### Financial Trajectory")
+        trajectory_chart(client_metrics)
+
+        # AI
+        st.markdown("---")
+        c_ai, c_note = st.columns(2)
+        with c_ai:
+            st.markdown("### 🤖 Strategy")
+            if st.button("Generate Note ✨", use_container_width=True):
+                if sidebar["ai_ready"]:
+                    with st.spinner("Consulting AI..."):
+                        try:
+                            with perf.stage("gemini"):
+                                note = note_generator(sidebar["api_key"]).generate(note_prompt(client_metrics))
+                            # The editor below renders after this, so it picks the note up without a rerun
+                            st.session_state.caseload.set_notes(selected_id, note)
+                        except Exception as e: st.error(f"Error: {e}")
+                        else: drop_report()
+                else: st.error("No API Key.")
+
+        with c_note:
+            st.markdown("### 📝 Notes")
+            notes_editor(selected_id)
+
+@st.fragment
+def trajectory_chart(client_metrics):
+    """The balance run-down for one participant; its own toggle reruns only the chart."""
+    with fragment_timing("trajectory chart"):
+        import plotly.express as px
+        show_ideal = st.toggle("Show ideal path", value=True, key="trajectory_ideal")
+        weeks_show = max(int(client_metrics['weeks_remaining']), 1) + 5
+        dates = [datetime.date.today() + timedelta(weeks=w) for w in range(weeks_show)]
+        y_act = [max(0, client_metrics['balance'] - (w * client_metrics['weekly_cost'])) for w in range(len(dates))]
+        chart_df = pd.DataFrame({"Date": dates, "Balance": y_act, "Type": "Actual Trajectory"})
+        if show_ideal:
+            rem = client_metrics['weeks_remaining']
+            ideal_wk = client_metrics['balance'] / rem if rem > 0 else 0
+            y_opt = [max(0, client_metrics['balance'] - (w * ideal_wk)) for w in range(len(dates))]
+            chart_df = pd.concat([chart_df, pd.DataFrame({"Date": dates, "Balance": y_opt, "Type": "Ideal Path"})], ignore_index=True)
+        fig = px.line(chart_df, x="Date", y="Balance", color="Type", color_discrete_map={"Actual Trajectory": client_metrics['color'], "Ideal Path": "#6e7681"})
+        fig.update_traces(patch={"line": {"dash": "dot"}}, selector={"legendgroup": "Ideal Path"})
+        try: fig.add_vline(x=client_metrics['plan_end'], line_dash="dash", line_color="#c9d1d9")
+        except: pass
+        fig.update_layout(height=350, hovermode="x unified", margin=dict(t=30,b=0,l=0,r=0), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+        st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def notes_editor(client_id):
+    """A participant's note; typing reruns only this. Notes aren't financial, so no metrics are recomputed."""
+    with fragment_timing("notes editor"):
+        current = st.session_state.caseload.notes(client_id)
+        new_note = st.text_area("Editor", value=current, height=150, label_visibility="collapsed")
+        if new_note != current:
+            st.session_state.caseload.set_notes(client_id, new_note)
+            drop_report()
@@ -0,0 +1,100 @@
+"""Who runs out of funds next: a depletion-date index kept in step with a Caseload."""
+import bisect
+import datetime
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from perf import timed
+from utils import calculate_client_metrics
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+class DepletionIndex:
+    """Active participants whose funds run out before their plan ends, ordered by depletion date.
+
+    With a constant weekly burn, runway and weeks remaining fall at the
+    same rate, so the health bands a participant sits in don't move
+    between edits. The dated event that does worsen someone's position
+    is the day the money runs out while the plan is still running, so
+    that is what this orders on: next(n) and within(days) answer "who
+    runs out next" and "whose position worsens within D days" with a
+    bisect instead of a scan.
+
+    sync() brings the index up to date. Single-record edits (and claims)
+    are applied one by one using Caseload.changed_since(); a new caseload,
+    a bulk change, a new day or switching the ledger on or off rebuilds it
+    from the metrics frame.
+    """
+
+    def __init__(self):
+        self._keys = []  # sorted (depletion date ordinal, id)
+        self._key_for = {}  # id -> its entry in _keys
+        self._state = None  # (caseload token, financial_version, today, ledger) the index reflects
+        self.rebuilds = 0
+        self.updates = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    @timed("DepletionIndex.sync")
+    def sync(self, caseload, metrics_cache, ledger=None):
+        """Catches up with the caseload. metrics_cache supplies the frame when a full rebuild is needed.
+
+        Pass the same ledger (or None) the metrics are computed with.
+        """
+        token, version = caseload.metrics_key
+        today = datetime.date.today()
+        state = self._state
+        if state is not None and state[0] is token and state[2] == today and state[3] is ledger:
+            if state[1] == version:
+                return
+            changed = caseload.changed_since(state[1])
+            if changed is not None:
+                for client_id in changed:
+                    burn = ledger.trailing_burn(client_id) if ledger is not None else None
+                    self._update(client_id, caseload.get(client_id), caseload.rate_table, burn)
+                self.updates += len(changed)
+                self._state = (token, version, today, ledger)
+                return
+        self._rebuild(metrics_cache.metrics_for(caseload, ledger))
+        self._state = (token, version, today, ledger)
+
+    def _rebuild(self, metrics):
+        runs_out = (metrics['weekly_cost'] > 0) & (metrics['runway_weeks'] < metrics['weeks_remaining'])
+        rows = metrics[runs_out]
+        # Days since 1970-01-01 plus the ordinal of that date gives date.toordinal() for the whole column
+        ordinals = pd.to_datetime(rows['depletion_date']).to_numpy(dtype="datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+        keys = pd.DataFrame({"d": ordinals, "id": rows['id'].to_numpy(dtype=object)}).sort_values(["d", "id"])
+        self._keys = list(zip(keys['d'].tolist(), keys['id'].tolist()))
+        self._key_for = {key[1]: key for key in self._keys}
+        self.rebuilds += 1
+
+    def _update(self, client_id, client, rate_table, actual_burn=None):
+        old = self._key_for.pop(client_id, None)
+        if old is not None:
+            del self._keys[bisect.bisect_left(self._keys, old)]
+        if client is None or client.exited:
+            return
+        m = calculate_client_metrics(client, rate_table, actual_burn)
+        if m['weekly_cost'] > 0 and m['runway_weeks'] < m['weeks_remaining']:
+            key = (m['depletion_date'].toordinal(), client_id)
+            bisect.insort(self._keys, key)
+            self._key_for[client_id] = key
+
+    def next(self, n):
+        """The next n participants to run out, soonest first, as [(depletion_date, id)]."""
+        return [(datetime.date.fromordinal(d), i) for d, i in self._keys[:n]]
+
+    def count_within(self, days):
+        """How many run out within the next `days` days (already-empty plans included)."""
+        limit = (datetime.date.today() + timedelta(days=days)).toordinal()
+        return bisect.bisect_right(self._keys, limit, key=lambda k: k[0])
+
+    def within(self, days):
+        """Everyone who runs out within the next `days` days, soonest first, as [(depletion_date, id)]."""
+        return self.next(self.count_within(days))
+
+    def depletion_date(self, client_id):
+        """When a participant runs out, or None if their funds outlast their plan."""
+        key = self._key_for.get(client_id)
+        return None if key is None else datetime.date.fromordinal(key[0])
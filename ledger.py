@@ -0,0 +1,171 @@
+"""Claims ledger: what was actually billed, per participant.
+
+Appending claims takes them off the participant's balance and folds them
+into small running aggregates (claimed per day over the trailing window),
+so the actual weekly burn is always to hand without re-reading the
+history. The history itself lives in the store when there is one.
+"""
+import datetime
+import numpy as np
+import pandas as pd
+from perf import timed
+from utils import RowErrors, parse_money_column
+
+CLAIM_FIELDS = ["client_id", "date", "hours", "amount", "line_item"]
+CLAIM_CSV_HEADERS = ["NDIS Number", "Date (YYYY-MM-DD)", "Hours", "Amount", "Line Item"]
+CLAIM_CHUNK_ROWS = 20000
+# Actual burn is averaged over this many weeks of claims
+TRAILING_WEEKS = 8
+
+def generate_claims_template():
+    """A blank claims CSV for bulk imports. Leave Amount blank to bill the hours at the participant's rate."""
+    df = pd.DataFrame(columns=CLAIM_CSV_HEADERS)
+    df.loc[0] = ["430123456", datetime.date.today().strftime("%Y-%m-%d"), 1.5, "", "07_002_0106_8_3"]
+    return df.to_csv(index=False).encode('utf-8')
+
+class ClaimsLedger:
+    """Claims per participant, with the trailing actual burn kept up to date as they are appended.
+
+    Per participant it keeps only {day: amount claimed} for the trailing
+    window and the date of their first claim, so appending a claim is
+    O(1) and trailing_burn() reads at most a window's worth of days.
+    version changes on every append.
+    """
+
+    def __init__(self, store=None, window_weeks=TRAILING_WEEKS):
+        self.window_days = window_weeks * 7
+        self.version = 0
+        self._store = store
+        self._days = {}  # id -> {day ordinal: amount}, trailing window only
+        self._first = {}  # id -> ordinal of their first claim
+        self._history = []  # claim frames, when there is no store to hold them
+        if store is not None:
+            since = datetime.date.today().toordinal() - self.window_days
+            for client_id, day, amount in store.claim_totals_since(datetime.date.fromordinal(since).isoformat()):
+                self._days.setdefault(client_id, {})[datetime.date.fromisoformat(day).toordinal()] = amount
+            self._first = {i: datetime.date.fromisoformat(d).toordinal() for i, d in store.first_claims()}
+
+    def __contains__(self, client_id):
+        return client_id in self._first
+
+    def _fold(self, claims):
+        """Adds a validated claims frame to the running aggregates."""
+        ordinals = claims['date'].map(datetime.date.toordinal)
+        oldest = datetime.date.today().toordinal() - self.window_days
+        recent = claims[ordinals > oldest]
+        daily = recent['amount'].groupby([recent['client_id'], ordinals[ordinals > oldest]]).sum()
+        for (client_id, day), amount in daily.items():
+            days = self._days.setdefault(client_id, {})
+            days[day] = days.get(day, 0.0) + amount
+        # Days that have slid out of the window are dropped for whoever was touched, so the aggregates stay window-sized
+        for client_id in daily.index.unique(level=0):
+            days = self._days[client_id]
+            if min(days) <= oldest:
+                self._days[client_id] = {d: a for d, a in days.items() if d > oldest}
+        for client_id, day in ordinals.groupby(claims['client_id']).min().items():
+            self._first[client_id] = min(day, self._first.get(client_id, day))
+
+    @timed("ClaimsLedger.append")
+    def append(self, caseload, claims):
+        """Records claims and takes them off balances.
+
+        claims is a DataFrame or list of dicts with CLAIM_FIELDS. A missing
+        amount bills the hours at the participant's rate. Returns the ids
+        whose balance changed. Raises KeyError, recording nothing, if a
+        client_id isn't in the caseload.
+        """
+        claims = pd.DataFrame(claims, columns=CLAIM_FIELDS)
+        if claims.empty:
+            return []
+        unknown = [i for i in claims['client_id'].unique() if i not in caseload]
+        if unknown:
+            raise KeyError(f"no participant with id {', '.join(map(str, unknown[:5]))}" + (f" and {len(unknown) - 5} more" if len(unknown) > 5 else ""))
+        claims['date'] = [d if isinstance(d, datetime.date) else datetime.date.fromisoformat(str(d)) for d in claims['date']]
+        claims['hours'] = pd.to_numeric(claims['hours'], errors='coerce').fillna(0.0)
+        unpriced = claims['amount'].isna()
+        if unpriced.any():
+            rates = pd.Series({i: caseload.get(i).rate for i in claims.loc[unpriced, 'client_id'].unique()})
+            claims.loc[unpriced, 'amount'] = claims.loc[unpriced, 'hours'] * claims.loc[unpriced, 'client_id'].map(rates)
+        claims['amount'] = claims['amount'].astype(float)
+        claims['line_item'] = claims['line_item'].fillna('')
+
+        if self._store is not None:
+            self._store.add_claims(claims.assign(date=[d.isoformat() for d in claims['date']]).itertuples(index=False, name=None))
+        else:
+            self._history.append(claims)
+        self._fold(claims)
+        self.version += 1
+        return caseload.apply_claims(claims['client_id'].tolist(), claims['amount'].to_numpy())
+
+    @timed("ClaimsLedger.import_csv")
+    def import_csv(self, caseload, uploaded_file, chunksize=CLAIM_CHUNK_ROWS):
+        """Streams a claims CSV in chunks, matching participants by NDIS number. Returns (claims recorded, errors).
+
+        Only one chunk is held at a time. Bad rows are skipped and reported
+        as {"row", "column", "reason"}, as in utils.import_csv.
+        """
+        recorded, errors = 0, []
+        date_col = "Date (YYYY-MM-DD)"
+        try:
+            for chunk in pd.read_csv(uploaded_file, dtype=str, chunksize=chunksize):
+                chunk.columns = chunk.columns.str.strip()
+                rows = RowErrors(chunk, errors)
+                report = rows.report
+                for column in ("NDIS Number", date_col):
+                    if column not in chunk:
+                        raise ValueError(f"missing column '{column}'")
+                if "Hours" not in chunk and "Amount" not in chunk:
+                    raise ValueError("needs an 'Hours' or 'Amount' column")
+                ids = pd.Series(caseload.ids_for_ndis(chunk["NDIS Number"].tolist()), index=chunk.index, dtype=object)
+                report(ids.isna(), "NDIS Number", "no participant with NDIS number '{value}'")
+                raw = chunk[date_col].str.strip()
+                dates = pd.to_datetime(raw, format="%Y-%m-%d", errors='coerce')
+                report(dates.isna(), date_col, "not a YYYY-MM-DD date: '{value}'")
+                numbers = {}
+                for column in ("Hours", "Amount"):
+                    if column not in chunk:
+                        numbers[column] = pd.Series(np.nan, index=chunk.index)
+                        continue
+                    numbers[column], invalid = parse_money_column(chunk[column])
+                    report(invalid, column, "not a number: '{value}'")
+                report(numbers["Hours"].isna() & numbers["Amount"].isna(), "Hours" if "Hours" in chunk else "Amount", "needs hours or an amount")
+
+                good = ~rows.bad
+                recorded += int(good.sum())
+                self.append(caseload, pd.DataFrame({
+                    "client_id": ids[good], "date": dates[good].dt.date, "hours": numbers["Hours"][good],
+                    "amount": numbers["Amount"][good],
+                    "line_item": chunk["Line Item"][good].str.strip() if "Line Item" in chunk else '',
+                }))
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, ValueError) as e:
+            errors.append({"row": None, "column": None, "reason": f"Could not read file: {e}"})
+        errors.sort(key=lambda e: e["row"] or 0)
+        return recorded, errors
+
+    def trailing_burn(self, client_id, today=None):
+        """Average weekly amount claimed over the trailing window, or None if the participant has no claims.
+
+        Participants who started claiming inside the window are averaged over the time since their first claim.
+        """
+        first = self._first.get(client_id)
+        if first is None:
+            return None
+        end = (today or datetime.date.today()).toordinal()
+        start = max(end - self.window_days, first - 1)
+        days = self._days.get(client_id, {})
+        claimed = sum(amount for day, amount in days.items() if start < day <= end)
+        return claimed / max(end - start, 7) * 7
+
+    def burn_column(self, client_ids, today=None):
+        """trailing_burn() for many participants as a float array, NaN for those without claims."""
+        return np.array([np.nan if b is None else b for b in (self.trailing_burn(i, today) for i in client_ids)], dtype=float)
+
+    def history(self, client_id, limit=None):
+        """A participant's claims, newest first."""
+        if self._store is not None:
+            rows = self._store.claims_for(client_id, limit)
+            return pd.DataFrame(rows, columns=CLAIM_FIELDS[1:]).assign(date=lambda d: pd.to_datetime(d['date']).dt.date)
+        frames = [f[f['client_id'] == client_id] for f in self._history]
+        claims = pd.concat(frames) if frames else pd.DataFrame(columns=CLAIM_FIELDS)
+        claims = claims.sort_values('date', ascending=False, kind='stable')[CLAIM_FIELDS[1:]]
+        return claims.head(limit) if limit else claims
@@ -0,0 +1,127 @@
+"""Typed client record mirroring the Client interface in types.ts."""
+import datetime
+import uuid
+
+RATES = {
+    "Level 2: Coordination of Supports": 100.14,
+    "Level 3: Specialist Support Coordination": 190.41
+}
+DEFAULT_LEVEL = "Level 2: Coordination of Supports"
+FIELDS = ("id", "name", "ndis_number", "level", "rate", "budget", "balance", "plan_end", "hours", "notes", "exited")
+
+def parse_money(value):
+    """One money (or hours) value -> float; None for blanks and NaN. Raises ValueError if it isn't a number.
+
+    Accepts "$18,000" style values from accounting exports.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip().replace("$", "").replace(",", "")
+        if not value:
+            return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("not a number") from None
+    return None if value != value else value
+
+def _number(d, field, default):
+    value = d.get(field)
+    if type(value) is float or type(value) is int:
+        return default if value != value else float(value)  # NaN counts as missing
+    try:
+        value = parse_money(value)
+    except ValueError:
+        raise ValueError(f"{field}: not a number: {value!r}") from None
+    return default if value is None else value  # blanks and NaN count as missing
+
+def parse_plan_end(value):
+    """date, datetime or 'YYYY-MM-DD' -> date. Blank -> None. Anything else raises ValueError."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"plan_end: not a YYYY-MM-DD date: {value!r}") from None
+
+class Client:
+    """One participant, validated once at ingest.
+
+    Numbers are floats, plan_end is a date (None if the plan has no end
+    date recorded) and notes is None until loaded from a store. get() reads
+    fields the way the old record dicts did, so dict-era callers keep working.
+    """
+    __slots__ = FIELDS
+
+    def __init__(self, id, name, ndis_number, level, rate, budget, balance, plan_end, hours, notes="", exited=False):
+        self.id = id
+        self.name = name
+        self.ndis_number = ndis_number
+        self.level = level
+        self.rate = rate
+        self.budget = budget
+        self.balance = balance
+        self.plan_end = plan_end
+        self.hours = hours
+        self.notes = notes
+        self.exited = exited
+
+    @classmethod
+    def from_dict(cls, d):
+        """Validates a record in the JSON backup shape. Raises ValueError naming the bad field."""
+        level = d.get('level') or DEFAULT_LEVEL
+        # Legacy records keep their weekly hours in 'hours_per_week'
+        hours = _number(d, 'hours', 0.0) or _number(d, 'hours_per_week', 0.0)
+        return cls(
+            id=str(d.get('id') or uuid.uuid4()),
+            name=str(d.get('name', 'Unknown')).strip(),
+            ndis_number=str(d.get('ndis_number') or '').strip(),
+            level=level,
+            rate=_number(d, 'rate', RATES.get(level, RATES[DEFAULT_LEVEL])),
+            budget=_number(d, 'budget', 0.0),
+            balance=_number(d, 'balance', 0.0),
+            plan_end=parse_plan_end(d.get('plan_end')),
+            hours=hours,
+            notes=d['notes'] if 'notes' in d else None,
+            exited=bool(d.get('exited')),
+        )
+
+    def to_dict(self):
+        """JSON backup shape: ISO plan_end, and 'notes' / 'exited' only when loaded / set."""
+        d = {"id": self.id, "name": self.name, "ndis_number": self.ndis_number, "level": self.level,
+             "rate": self.rate, "budget": self.budget, "balance": self.balance, "hours": self.hours}
+        if self.plan_end is not None:
+            d["plan_end"] = self.plan_end.isoformat()
+        if self.notes is not None:
+            d["notes"] = self.notes
+        if self.exited:
+            d["exited"] = True
+        return d
+
+    def get(self, field, default=None):
+        value = getattr(self, field, None) if field in FIELDS else None
+        return default if value is None else value
+
+    def __repr__(self):
+        return f"Client(id={self.id!r}, name={self.name!r})"
+
+def clients_from_records(records):
+    """Validates backup records. Returns (clients, errors) with errors as {"row", "column", "reason"}, rows 1-based."""
+    clients, errors = [], []
+    for i, record in enumerate(records, start=1):
+        if isinstance(record, Client):
+            clients.append(record)
+        elif not isinstance(record, dict):
+            errors.append({"row": i, "column": None, "reason": "not a client record"})
+        else:
+            try:
+                clients.append(Client.from_dict(record))
+            except ValueError as e:
+                column, reason = str(e).split(": ", 1)
+                errors.append({"row": i, "column": column, "reason": reason})
+    return clients, errors
@@ -0,0 +1,125 @@
+"""Opt-in per-rerun stage timings for the dashboard.
+
+A run is only active between start_run() and finish_run(); outside one,
+stage() hands back a shared no-op context and timed() functions call
+straight through, so instrumentation costs one ContextVar lookup when the
+panel is off. The active run is looked up per thread (each session's
+script runs on its own thread), so concurrent sessions never mix timings.
+"""
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
+import time
+from collections import deque
+
+_current = contextvars.ContextVar("perf_run", default=None)
+_NULL = contextlib.nullcontext()
+
+class PerfRun:
+    """Accumulated stage timings for one script run. Nested stages are recorded as 'outer › inner'."""
+
+    def __init__(self, label=""):
+        self.label = label
+        self.started = datetime.datetime.now()
+        self.stages = {}
+        self.total = None
+        self._stack = []
+        self._t0 = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        self._stack.append(name)
+        key = " › ".join(self._stack)
+        self.stages.setdefault(key, 0.0)  # registered on entry so parents list before their children
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[key] += time.perf_counter() - start
+            self._stack.pop()
+
+    def to_dict(self):
+        return {"started": self.started.isoformat(timespec="seconds"), "label": self.label,
+                "total_ms": round(self.total * 1000, 3) if self.total is not None else None,
+                "stages_ms": {k: round(v * 1000, 3) for k, v in self.stages.items()}}
+
+class PerfHistory:
+    """One session's open run plus its last N finished ones, optionally appended to a JSON-lines log."""
+
+    def __init__(self, size=10, log_path=None):
+        self.runs = deque(maxlen=size)
+        self.log_path = log_path
+        self.open = None
+
+    def record(self, run):
+        self.runs.append(run)
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(run.to_dict()) + "\n")
+
+    def table(self):
+        """{stage: [ms per run, oldest first]} with 'TOTAL' first; stages missing from a run are None."""
+        runs = list(self.runs)
+        stages = list(dict.fromkeys(k for r in runs for k in r.stages))
+        table = {"TOTAL": [r.total * 1000 for r in runs]}
+        for s in stages:
+            table[s] = [r.stages[s] * 1000 if s in r.stages else None for r in runs]
+        return table
+
+def start_run(history, enabled=True):
+    """Begins timing a script run. A run cut short by st.rerun() is recorded first, so work done
+    just before a rerun (a Gemini call, an import) still shows up. Disabled, nothing is timed."""
+    if history.open is not None:
+        history.open.label = "interrupted by rerun"
+        finish_run(history)
+    run = PerfRun() if enabled else None
+    history.open = run
+    _current.set(run)
+    return run
+
+def finish_run(history):
+    """Closes and records the session's open run, if any. Safe to call more than once."""
+    run, history.open = history.open, None
+    _current.set(None)
+    if run is None:
+        return None
+    run.total = time.perf_counter() - run._t0
+    history.record(run)
+    return run
+
+@contextlib.contextmanager
+def fragment(history, name, enabled=True):
+    """Times a Streamlit fragment. Inside a full run it is one more stage; rerun on its own, it is
+    recorded as a run of its own, labelled with the fragment's name."""
+    if _current.get() is not None:
+        with stage(name):
+            yield
+        return
+    run = start_run(history, enabled)
+    if run is not None:
+        run.label = f"fragment: {name}"
+    try:
+        with stage(name):
+            yield
+    finally:
+        finish_run(history)
+
+def stage(name):
+    run = _current.get()
+    return run.stage(name) if run is not None else _NULL
+
+def timed(name=None):
+    """Decorator form of stage() for library functions."""
+    def wrap(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            run = _current.get()
+            if run is None:
+                return fn(*args, **kwargs)
+            with run.stage(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return wrap
@@ -0,0 +1,83 @@
+"""Week-by-week cash-flow projection for the whole caseload."""
+import datetime
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from perf import timed
+from rates import rate_schedule
+
+PROJECTION_COLUMNS = ["week", "date", "level", "funds_remaining", "revenue", "running_out"]
+# Clients are projected this many at a time so the weeks x clients matrices stay small
+PROJECTION_CHUNK = 20000
+
+def _spent(t, cost, starts):
+    """Billed from today to week t, each row paying cost[:, j] a week from starts[j] on (t is weeks x rows)."""
+    ends = np.append(starts[1:], np.inf)
+    total = np.zeros(t.shape)
+    for j in range(len(starts)):
+        total += cost[:, j] * np.clip(np.minimum(t, ends[j]) - starts[j], 0, None)
+    return total
+
+def _project_chunk(balance, cost, starts, plan_weeks, runway, onehot, weeks):
+    """Sums one chunk of clients into (funds, revenue, running_out), each weeks x levels."""
+    w = weeks[:, None]
+    # Billing stops when the money or the plan runs out, whichever is first
+    stop = np.minimum(runway, plan_weeks)
+    billed = _spent(np.minimum(w, stop), cost, starts)
+    # Funds still usable at the start of week w; whatever is left at plan end lapses
+    funds = np.where(w <= plan_weeks, np.maximum(balance - billed, 0), 0)
+    # What is billed during week w, at the price in force over it
+    revenue = _spent(np.minimum(w + 1, stop), cost, starts) - billed
+    # Clients whose money runs out during week w, before their plan ends
+    out = (runway < plan_weeks) & (np.floor(runway) == w)
+    return funds @ onehot, revenue @ onehot, out.astype(float) @ onehot
+
+@timed()
+def project_portfolio(metrics, horizon_weeks=52, today=None, rate_table=None):
+    """Projects a metrics DataFrame forward, assuming everyone keeps billing their current hours.
+
+    Returns one row per (week, level), weeks 0..horizon_weeks, where week 0
+    is today: funds_remaining at the start of the week, revenue billed
+    during it and how many clients run out of money during it. With a
+    rate_table, guide-priced clients pay each price from the day it takes
+    effect, as in calculate_caseload_metrics.
+    """
+    today = today or datetime.date.today()
+    weeks = np.arange(horizon_weeks + 1, dtype=float)
+    codes, levels = pd.factorize(metrics['level'].fillna("Unknown").astype(str), sort=True)
+    shape = (len(weeks), len(levels))
+    funds, revenue, running_out = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+
+    balance = metrics['balance'].to_numpy(dtype=float)
+    weekly_cost = metrics['weekly_cost'].to_numpy(dtype=float)
+    plan_weeks = metrics['weeks_remaining'].to_numpy(dtype=float)
+    runway = metrics['runway_weeks'].to_numpy(dtype=float)
+    if rate_table is not None and rate_table.changes_after(today):
+        rate = metrics['rate'].to_numpy(dtype=float)
+        starts, seg_rates = rate_schedule(metrics['level'], rate, rate_table, today)
+        # Hours actually billed, so clients planned on actual burn keep their pace across a price change
+        with np.errstate(divide='ignore', invalid='ignore'):
+            hours = np.where(rate > 0, weekly_cost / rate, metrics['hours'].to_numpy(dtype=float))
+        cost = hours[:, None] * seg_rates
+    else:
+        starts, cost = np.zeros(1), weekly_cost[:, None]
+    for start in range(0, len(metrics), PROJECTION_CHUNK):
+        part = slice(start, start + PROJECTION_CHUNK)
+        onehot = np.eye(len(levels))[codes[part]]
+        f, r, o = _project_chunk(balance[part], cost[part], starts, plan_weeks[part], runway[part], onehot, weeks)
+        funds += f
+        revenue += r
+        running_out += o
+
+    return pd.DataFrame({
+        "week": np.repeat(weeks.astype(int), len(levels)),
+        "date": np.repeat([today + timedelta(weeks=int(w)) for w in weeks], len(levels)),
+        "level": np.tile(np.asarray(levels, dtype=object), len(weeks)),
+        "funds_remaining": funds.ravel(),
+        "revenue": revenue.ravel(),
+        "running_out": running_out.ravel().astype(int),
+    }, columns=PROJECTION_COLUMNS)
+
+def portfolio_totals(projection):
+    """Collapses a projection across levels: one row per week."""
+    return projection.groupby(["week", "date"], as_index=False)[["funds_remaining", "revenue", "running_out"]].sum()
@@ -0,0 +1,124 @@
+"""Effective-dated NDIS price tables for support coordination.
+
+The NDIS Pricing Arrangements change each July. A RateTable holds every
+version with the date it takes effect, so metrics can bill each part of
+a plan at the price in force at the time and the caseload can be
+repriced in one pass when a new version starts.
+"""
+import bisect
+import datetime
+import numpy as np
+import pandas as pd
+from models import RATES
+
+# The prices models.RATES has carried since the 2024-25 Pricing Arrangements
+DEFAULT_EFFECTIVE_FROM = datetime.date(2024, 7, 1)
+
+class RateTable:
+    """Price versions, each in force from its effective date until the next one starts.
+
+    Tables are immutable: with_version() returns a new table, so anything
+    keyed on a table (a metrics cache, a preview) can't go stale in place.
+    A record is on the price guide when its rate is one the table has
+    listed for its level; anything else is a negotiated rate and is left
+    alone by repricing and by future price changes.
+    """
+
+    def __init__(self, versions=None):
+        versions = {DEFAULT_EFFECTIVE_FROM: dict(RATES)} if versions is None else dict(versions)
+        if not versions:
+            raise ValueError("a rate table needs at least one version")
+        self._versions = sorted((d, dict(r)) for d, r in versions.items())
+        self._dates = [d for d, _ in self._versions]
+
+    def __eq__(self, other):
+        return isinstance(other, RateTable) and self._versions == other._versions
+
+    def __hash__(self):
+        return hash(tuple((d, tuple(sorted(r.items()))) for d, r in self._versions))
+
+    def __repr__(self):
+        return f"RateTable({', '.join(d.isoformat() for d in self._dates)})"
+
+    @property
+    def versions(self):
+        """[(effective_from, {level: rate})], oldest first."""
+        return [(d, dict(r)) for d, r in self._versions]
+
+    def with_version(self, effective_from, rates):
+        """A new table with this version added (replacing one with the same date)."""
+        versions = dict(self._versions)
+        versions[effective_from] = dict(rates)
+        return RateTable(versions)
+
+    def rates_on(self, day=None):
+        """{level: rate} in force on a day (today by default). Before the first version, the first version applies."""
+        day = day or datetime.date.today()
+        i = max(bisect.bisect_right(self._dates, day) - 1, 0)
+        return dict(self._versions[i][1])
+
+    def levels(self):
+        return list(dict.fromkeys(level for _, r in self._versions for level in r))
+
+    def guide_rates(self, level):
+        """Every rate this table has listed for a level."""
+        return {r[level] for _, r in self._versions if level in r}
+
+    def changes_after(self, day):
+        """[(effective_from, {level: rate})] for versions that start after day, in date order."""
+        return [(d, dict(r)) for d, r in self._versions if d > day]
+
+    def to_records(self):
+        """Long form for storage: [{"effective_from", "level", "rate"}]."""
+        return [{"effective_from": d.isoformat(), "level": level, "rate": rate} for d, r in self._versions for level, rate in r.items()]
+
+    @classmethod
+    def from_records(cls, records):
+        """Inverse of to_records(). No records gives the default table."""
+        versions = {}
+        for rec in records:
+            day = rec["effective_from"]
+            day = day if isinstance(day, datetime.date) else datetime.date.fromisoformat(str(day))
+            versions.setdefault(day, {})[rec["level"]] = float(rec["rate"])
+        return cls(versions or None)
+
+def guide_mask(levels, rates, table):
+    """Boolean array: which (level, rate) pairs are on the table's price guide."""
+    levels = pd.Series(levels, dtype=object).to_numpy()
+    rates = np.asarray(rates, dtype=float)
+    mask = np.zeros(len(rates), dtype=bool)
+    for level in table.levels():
+        rows = levels == level
+        mask[rows] = np.isin(rates[rows], list(table.guide_rates(level)))
+    return mask
+
+def repriced_rates(levels, rates, table, day=None):
+    """The rate column after repricing to the prices in force on day: guide-priced rows move, the rest keep theirs."""
+    levels = pd.Series(levels, dtype=object).to_numpy()
+    new = np.asarray(rates, dtype=float).copy()
+    on_guide = guide_mask(levels, new, table)
+    for level, rate in table.rates_on(day).items():
+        new[on_guide & (levels == level)] = rate
+    return new
+
+def rate_schedule(levels, rates, table, today):
+    """When the price changes after today and what each row pays from then on.
+
+    Returns (starts, seg_rates): starts[j] is when segment j begins, in weeks
+    from today (starts[0] == 0), and seg_rates[:, j] the rate each row pays
+    during it. Segment 0 is the record's own rate; later segments follow the
+    table for guide-priced rows and keep the record's rate for the rest.
+    """
+    rates = np.asarray(rates, dtype=float)
+    changes = table.changes_after(today) if table is not None else []
+    starts = np.array([0.0] + [(d - today).days / 7 for d, _ in changes])
+    seg_rates = np.empty((len(rates), len(starts)))
+    seg_rates[:, 0] = rates
+    if changes:
+        levels = pd.Series(levels, dtype=object).to_numpy()
+        on_guide = guide_mask(levels, rates, table)
+        for j, (_, version) in enumerate(changes, start=1):
+            seg_rates[:, j] = seg_rates[:, j - 1]
+            for level, rate in version.items():
+                seg_rates[on_guide & (levels == level), j] = rate
+    return starts, seg_rates
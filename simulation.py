@@ -0,0 +1,132 @@
+"""Monte Carlo burn simulation: weekly hours as a distribution instead of a fixed number.
+
+calculate_client_metrics assumes exactly `hours` are billed every week.
+Here each week's hours are drawn from a gamma distribution with that
+mean, many trials per participant, giving a probability of running short
+before plan end and a spread of depletion dates. With cv=0 every trial
+bills exactly `hours`, and the dates are calculate_client_metrics'
+depletion_date (at a flat price: scheduled price changes aren't simulated).
+
+Every participant draws from their own generator, seeded from the run's
+seed and their id, so a participant's results are the same however the
+caseload is chunked, paged or spread across processes.
+"""
+import datetime
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from perf import timed
+
+SIMULATION_COLUMNS = ["shortfall_probability", "depletion_p10", "depletion_p50", "depletion_p90"]
+DEFAULT_TRIALS = 1000
+# Week-to-week spread of hours as a fraction of the mean (coefficient of variation)
+DEFAULT_HOURS_CV = 0.35
+# Participants per task handed to the process pool
+SIMULATION_CHUNK = 2000
+# Below this many participants, starting worker processes costs more than it saves
+PARALLEL_MIN_CLIENTS = 5000
+
+def client_seed(seed, client_id):
+    """The SeedSequence for one participant's trials."""
+    key = int.from_bytes(hashlib.blake2b(str(client_id).encode(), digest_size=8).digest(), "big")
+    return np.random.SeedSequence(seed, spawn_key=(key,))
+
+def _simulate_client(rng, balance, weekly_cost, weeks_remaining, trials, cv):
+    """(shortfall probability, [p10, p50, p90] days until the money runs out; inf if it outlasts the plan)."""
+    n_weeks = int(np.ceil(weeks_remaining))
+    if weekly_cost <= 0 or n_weeks == 0:
+        return 0.0, [np.inf] * 3
+    # The last week of the plan may be a part week
+    weight = np.clip(weeks_remaining - np.arange(n_weeks), 0, 1)
+    if cv == 0:
+        # Every trial is the fixed-hours burn: work it out the way calculate_client_metrics does, day rounding included
+        runway = balance / weekly_cost
+        short = runway < weeks_remaining
+        return float(short), [np.trunc(runway * 7) if short else np.inf] * 3
+    # Gamma with mean 1: hours stay positive and average out to the planned hours
+    factor = rng.gamma(1 / cv**2, cv**2, size=(trials, n_weeks))
+    spend = weekly_cost * weight * factor
+    spent = np.cumsum(spend, axis=1)
+    over = spent > balance
+    short = over[:, -1]
+    # Day the balance hits zero, interpolated within the week it happens
+    week = over.argmax(axis=1)
+    trial = np.arange(trials)
+    before = spent[trial, week] - spend[trial, week]
+    # Divide by the full-week rate: a part week at the end is billed at the same pace, just for fewer days
+    within = np.clip((balance - before) / (weekly_cost * factor[trial, week]), 0, 1)
+    days = np.where(short, np.trunc((week + within) * 7), np.inf)
+    # inverted_cdf: the first day by which that share of trials has run out, never an interpolation with inf
+    return float(short.mean()), np.percentile(days, [10, 50, 90], method="inverted_cdf").tolist()
+
+def _simulate_chunk(ids, balance, weekly_cost, weeks_remaining, trials, cv, seed):
+    probability = np.empty(len(ids))
+    days = np.empty((len(ids), 3))
+    for i, client_id in enumerate(ids):
+        rng = np.random.default_rng(client_seed(seed, client_id))
+        probability[i], days[i] = _simulate_client(rng, balance[i], weekly_cost[i], weeks_remaining[i], trials, cv)
+    return probability, days
+
+@timed()
+def simulate_caseload(metrics, trials=DEFAULT_TRIALS, cv=DEFAULT_HOURS_CV, seed=0, workers=None, today=None):
+    """Simulates every row of a metrics DataFrame. Returns SIMULATION_COLUMNS on the same index.
+
+    depletion_pNN is the date by which NN% of trials have run out, or None
+    if fewer than NN% run out before plan end; p10 is the pessimistic case.
+    Caseloads of PARALLEL_MIN_CLIENTS or more are split across a process
+    pool of `workers` (default: CPU count); workers=1 keeps it in-process.
+    """
+    today = today or datetime.date.today()
+    ids = metrics['id'].to_numpy(dtype=object)
+    columns = [metrics[c].to_numpy(dtype=float) for c in ('balance', 'weekly_cost', 'weeks_remaining')]
+    chunks = [slice(i, i + SIMULATION_CHUNK) for i in range(0, len(ids), SIMULATION_CHUNK)]
+    args = [(ids[s], *(col[s] for col in columns), trials, cv, seed) for s in chunks]
+    if len(ids) >= PARALLEL_MIN_CLIENTS and workers != 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, *zip(*args)))
+    else:
+        results = [_simulate_chunk(*a) for a in args]
+
+    probability = np.concatenate([r[0] for r in results]) if results else np.empty(0)
+    days = np.concatenate([r[1] for r in results]) if results else np.empty((0, 3))
+    out = pd.DataFrame({"shortfall_probability": probability}, index=metrics.index)
+    for j, name in enumerate(SIMULATION_COLUMNS[1:]):
+        out[name] = [None if np.isinf(d) else today + timedelta(days=int(d)) for d in days[:, j]]
+    return out
+
+# What a participant's trials depend on besides the run settings
+SIMULATION_INPUTS = ['id', 'balance', 'weekly_cost', 'weeks_remaining']
+
+class SimulationCache:
+    """Simulation results per participant, kept until the caseload's financials or the date change.
+
+    The dashboard only simulates the rows it is showing, so paging through
+    the table fills this in a page at a time. Results are keyed on each
+    row's inputs too, so planning on actual burn (or a new claim) never
+    reuses trials run on another weekly cost.
+    """
+
+    def __init__(self, trials=DEFAULT_TRIALS, cv=DEFAULT_HOURS_CV, seed=0):
+        self.trials = trials
+        self.cv = cv
+        self.seed = seed
+        self._key = None
+        self._results = {}  # SIMULATION_INPUTS tuple -> row of SIMULATION_COLUMNS
+
+    def __len__(self):
+        return len(self._results)
+
+    def results_for(self, caseload, metrics):
+        """SIMULATION_COLUMNS for the given metrics rows (a page, or everything), simulating only what is new."""
+        key = (caseload.metrics_key, datetime.date.today(), self.trials, self.cv, self.seed)
+        if key != self._key:
+            self._key, self._results = key, {}
+        inputs = list(metrics[SIMULATION_INPUTS].itertuples(index=False, name=None))
+        missing = metrics[[i not in self._results for i in inputs]]
+        if len(missing):
+            fresh = simulate_caseload(missing, self.trials, self.cv, self.seed)
+            self._results.update(zip(missing[SIMULATION_INPUTS].itertuples(index=False, name=None), fresh.itertuples(index=False, name=None)))
+        rows = [self._results[i] for i in inputs]
+        return pd.DataFrame(rows, columns=SIMULATION_COLUMNS, index=metrics.index)
@@ -0,0 +1,252 @@
+"""Daily snapshots of each participant's metrics, stored as deltas.
+
+A snapshot row holds only the fields that changed since the
+participant's previous snapshot; everything else is carried forward
+when the history is read back. Surplus is the exception to "nothing
+changed": it creeps up every day as the plan runs down, even when
+nobody touches the record. It is stored only when it strays from that
+drift (balance edits, claims, price changes), so an untouched
+participant costs nothing from one day to the next.
+"""
+import datetime
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from perf import timed
+from depletion import EPOCH_ORDINAL
+from utils import METRIC_COLUMNS, STATUS_RANK, calculate_caseload_metrics, calculate_client_metrics
+
+SNAPSHOT_FIELDS = ["balance", "surplus", "weekly_cost", "plan_end", "status"]
+# One stored row: NaN/None in a field means "unchanged"; gone marks a participant leaving the active caseload
+DELTA_COLUMNS = ["day", "client_id"] + SNAPSHOT_FIELDS + ["gone"]
+# Surplus is only stored when it differs from its expected drift by more than this ($)
+SURPLUS_TOLERANCE = 0.5
+SPARKLINE_DAYS = 90
+
+def _weeks_left(plan_end, day):
+    """weeks_remaining as metrics compute it, from date ordinals."""
+    return np.maximum(plan_end - day, 0) / 7
+
+def _ordinals(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+
+class SnapshotHistory:
+    """Per-participant metrics history, one snapshot a day, stored as deltas.
+
+    _state holds what the history currently says about each active
+    participant, so a new snapshot is compared against it rather than
+    against the stored rows. Surplus is kept as an anchor (the day and
+    value it was last stored); between anchors it is the anchor plus
+    weekly_cost for every week the plan has run down since. weekly_cost
+    or plan_end changing always re-anchors it.
+
+    capture() is cheap to call on every rerun: it does nothing until the
+    caseload or the date changes, and single-record edits are snapshotted
+    one by one using Caseload.changed_since().
+    """
+
+    def __init__(self, store=None):
+        self._store = store
+        self._deltas = []  # delta frames, when there is no store to hold them
+        self._key = None  # (caseload token, financial_version, today) last captured
+        self.rows = 0
+        rows = pd.DataFrame(store.snapshot_rows(), columns=DELTA_COLUMNS) if store is not None else None
+        self._state = self._replay(rows) if rows is not None and len(rows) else self._empty_state()
+        if rows is not None:
+            self.rows = len(rows)
+
+    def __len__(self):
+        return len(self._state)
+
+    @staticmethod
+    def _empty_state():
+        return pd.DataFrame({"balance": pd.Series(dtype=float), "weekly_cost": pd.Series(dtype=float), "plan_end": pd.Series(dtype=np.int64),
+                             "status": pd.Series(dtype=object), "anchor_day": pd.Series(dtype=np.int64), "anchor_surplus": pd.Series(dtype=float)})
+
+    @staticmethod
+    def _replay(rows):
+        """The latest state of every participant still present, from stored delta rows in the order written."""
+        rows = rows.copy()
+        rows['gone'] = rows['gone'].astype(bool)
+        # Only rows since each participant's last exit count
+        rows['segment'] = rows.groupby('client_id')['gone'].cumsum()
+        rows = rows[rows['segment'] == rows.groupby('client_id')['segment'].transform('max')]
+        rows = rows[~rows['gone']]
+        if rows.empty:
+            return SnapshotHistory._empty_state()
+        rows = rows.assign(day=_ordinals(rows['day']), plan_end=rows['plan_end'].where(rows['plan_end'].notna()))
+        last = rows.groupby('client_id', sort=False)[['balance', 'weekly_cost', 'plan_end', 'status']].last()
+        anchors = rows[rows['surplus'].notna()].groupby('client_id', sort=False)[['day', 'surplus']].last()
+        state = pd.DataFrame({
+            "balance": last['balance'].astype(float),
+            "weekly_cost": last['weekly_cost'].astype(float),
+            "plan_end": _ordinals(last['plan_end']),
+            "status": last['status'].astype(object),
+        }, index=last.index)
+        state['anchor_day'] = anchors['day'].reindex(state.index).astype(np.int64)
+        state['anchor_surplus'] = anchors['surplus'].reindex(state.index).astype(float)
+        return state
+
+    @timed("SnapshotHistory.capture")
+    def capture(self, caseload, metrics=None):
+        """Snapshots today's planned metrics if anything changed since the last capture. Returns the rows written.
+
+        metrics may be passed to save recomputing them, but must be the
+        planned figures (no ledger), or actual burn would be recorded as
+        a change of plan.
+        """
+        token, version = caseload.metrics_key
+        today = datetime.date.today()
+        key = self._key
+        if key is not None and key[0] is token and key[2] == today:
+            if key[1] == version:
+                return 0
+            changed = caseload.changed_since(key[1])
+            if changed is not None:
+                clients = (caseload.get(i) for i in changed)
+                fresh = [calculate_client_metrics(c, caseload.rate_table) for c in clients if c is not None and not c.exited]
+                written = self.record(pd.DataFrame(fresh, columns=METRIC_COLUMNS), today, scope=changed)
+                self._key = (token, version, today)
+                return written
+        if metrics is None:
+            metrics = calculate_caseload_metrics(caseload.frame(), caseload.rate_table)
+        written = self.record(metrics, today)
+        self._key = (token, version, today)
+        return written
+
+    @timed("SnapshotHistory.record")
+    def record(self, metrics, day=None, scope=None):
+        """Stores the delta between the history and a metrics frame for `day`. Returns the rows written.
+
+        metrics covers everyone active, or with scope, the active ones among
+        the ids in scope; anyone the history has but metrics lacks is
+        recorded as gone. Recording the same day again adds to it, and the
+        last write of a day wins.
+        """
+        day = day or datetime.date.today()
+        d = day.toordinal()
+        state = self._state
+        new = pd.DataFrame({
+            "balance": metrics['balance'].to_numpy(dtype=float),
+            "weekly_cost": metrics['weekly_cost'].to_numpy(dtype=float),
+            "plan_end": _ordinals(metrics['plan_end'].to_numpy()),
+            "status": metrics['status'].astype(object).to_numpy(),
+        }, index=pd.Index(metrics['id'].to_numpy(dtype=object)))
+        surplus = metrics['surplus'].to_numpy(dtype=float)
+        before = state.index if scope is None else state.index.intersection(pd.Index(list(scope), dtype=object))
+        gone = before.difference(new.index)
+
+        prev = state.reindex(new.index)
+        seen = prev['status'].notna().to_numpy()
+        changed = {
+            "balance": ~seen | (new['balance'].to_numpy() != prev['balance'].to_numpy()),
+            "weekly_cost": ~seen | ~np.isclose(new['weekly_cost'].to_numpy(), prev['weekly_cost'].to_numpy(), rtol=0, atol=1e-9),
+            "plan_end": ~seen | (new['plan_end'].to_numpy() != prev['plan_end'].to_numpy()),
+            "status": ~seen | (new['status'].to_numpy() != prev['status'].to_numpy()),
+        }
+        # Where surplus would be today if only the calendar had moved
+        end, anchor = prev['plan_end'].to_numpy(dtype=float), prev['anchor_day'].to_numpy(dtype=float)
+        expected = prev['anchor_surplus'].to_numpy() + prev['weekly_cost'].to_numpy() * (_weeks_left(end, anchor) - _weeks_left(end, d))
+        with np.errstate(invalid='ignore'):
+            drifted = ~(np.abs(surplus - expected) <= SURPLUS_TOLERANCE)
+        changed["surplus"] = changed["weekly_cost"] | changed["plan_end"] | drifted
+        any_change = np.logical_or.reduce(list(changed.values()))
+
+        rows = pd.DataFrame({"day": day.isoformat(), "client_id": new.index[any_change]})
+        rows["balance"] = np.where(changed["balance"], new['balance'], np.nan)[any_change]
+        rows["surplus"] = np.where(changed["surplus"], surplus, np.nan)[any_change]
+        rows["weekly_cost"] = np.where(changed["weekly_cost"], new['weekly_cost'], np.nan)[any_change]
+        rows["plan_end"] = [datetime.date.fromordinal(int(e)).isoformat() if c else None
+                            for e, c in zip(new['plan_end'].to_numpy()[any_change], changed["plan_end"][any_change])]
+        rows["status"] = np.where(changed["status"], new['status'], None)[any_change]
+        rows["gone"] = 0
+        exits = pd.DataFrame({"day": day.isoformat(), "client_id": gone, "gone": 1}, columns=DELTA_COLUMNS)
+        delta = pd.concat([rows, exits], ignore_index=True) if len(exits) else rows
+        self._write(delta)
+
+        # The history's view moves on: changed fields from metrics, surplus re-anchored where it was stored
+        update = new.copy()
+        update['anchor_day'] = np.where(changed["surplus"], d, prev['anchor_day'].fillna(d)).astype(np.int64)
+        update['anchor_surplus'] = np.where(changed["surplus"], surplus, prev['anchor_surplus'])
+        if scope is None:
+            self._state = update
+        else:
+            kept = state.drop(new.index.union(gone), errors='ignore')
+            self._state = pd.concat([kept, update]) if len(kept) else update
+        return len(delta)
+
+    def _write(self, delta):
+        if delta.empty:
+            return
+        if self._store is not None:
+            self._store.add_snapshots(delta.astype(object).where(delta.notna(), None).itertuples(index=False, name=None))
+        else:
+            self._deltas.append(delta)
+        self.rows += len(delta)
+
+    def _stored(self, client_id=None, until=None):
+        """Delta rows in the order written, optionally for one participant and up to a day."""
+        if self._store is not None:
+            return pd.DataFrame(self._store.snapshot_rows(client_id, until and until.isoformat()), columns=DELTA_COLUMNS)
+        frames = [f if client_id is None else f[f['client_id'] == client_id] for f in self._deltas]
+        rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=DELTA_COLUMNS)
+        return rows[rows['day'] <= until.isoformat()] if until else rows
+
+    @timed("SnapshotHistory.series")
+    def series(self, client_id, start=None, end=None):
+        """One participant's SNAPSHOT_FIELDS for every day from start to end (the last SPARKLINE_DAYS by default).
+
+        Days between snapshots carry the previous snapshot forward, surplus
+        drifting as it would have; days before the first snapshot, or while
+        the participant was not active, are left out.
+        """
+        end = end or datetime.date.today()
+        start = start or end - timedelta(days=SPARKLINE_DAYS)
+        rows = self._stored(client_id, end)
+        if rows.empty:
+            return pd.DataFrame(columns=["day"] + SNAPSHOT_FIELDS)
+        rows = rows.assign(day=_ordinals(rows['day']), gone=rows['gone'].astype(bool))
+        rows['anchor_day'] = rows['day'].where(rows['surplus'].notna())
+        # Forward-fill within each stretch of being active, then keep the last write of each day
+        segment = rows['gone'].cumsum()
+        fields = ['balance', 'surplus', 'weekly_cost', 'plan_end', 'status', 'anchor_day']
+        rows[fields] = rows.groupby(segment)[fields].ffill()
+        rows.loc[rows['gone'], fields] = None
+        daily = rows.groupby('day').last()
+        daily = daily.reindex(np.arange(daily.index.min(), end.toordinal() + 1)).ffill()
+        daily = daily[(daily.index >= start.toordinal()) & ~daily['gone'].astype(bool) & daily['status'].notna()]
+        plan_end = _ordinals(daily['plan_end'])
+        out = pd.DataFrame({
+            "day": [datetime.date.fromordinal(int(d)) for d in daily.index],
+            "balance": daily['balance'].astype(float).to_numpy(),
+            "surplus": (daily['surplus'] + daily['weekly_cost'] * (_weeks_left(plan_end, daily['anchor_day'].to_numpy()) - _weeks_left(plan_end, daily.index.to_numpy()))).astype(float).to_numpy(),
+            "weekly_cost": daily['weekly_cost'].astype(float).to_numpy(),
+            "plan_end": [datetime.date.fromordinal(int(e)) for e in plan_end],
+            "status": daily['status'].to_numpy(dtype=object),
+        })
+        return out
+
+    @timed("SnapshotHistory.status_changes")
+    def status_changes(self, since, until=None):
+        """Health status changes on days after `since` up to `until` (today).
+
+        One row per participant per day their status ended the day different
+        from the day before: client_id, day, previous, status, worsened.
+        Participants joining or leaving the caseload are not changes.
+        """
+        until = until or datetime.date.today()
+        if self._store is not None:
+            rows = pd.DataFrame(self._store.snapshot_status_rows(since.isoformat(), until.isoformat()), columns=["day", "client_id", "status", "gone"])
+        else:
+            rows = self._stored(until=until)[["day", "client_id", "status", "gone"]]
+            rows = rows[rows['status'].notna() | (rows['gone'] == 1)]
+        columns = ["client_id", "day", "previous", "status", "worsened"]
+        if rows.empty:
+            return pd.DataFrame(columns=columns)
+        rows = rows.assign(status=rows['status'].where(rows['gone'] != 1, None))
+        rows = rows.drop_duplicates(['client_id', 'day'], keep='last')
+        rows['previous'] = rows.groupby('client_id')['status'].shift()
+        rows = rows[(rows['day'] > since.isoformat()) & rows['previous'].notna() & rows['status'].notna() & (rows['status'] != rows['previous'])]
+        rows = rows.assign(day=pd.to_datetime(rows['day']).dt.date,
+                           worsened=rows['status'].astype(object).map(STATUS_RANK) < rows['previous'].astype(object).map(STATUS_RANK))
+        return rows[columns].sort_values(['day', 'client_id']).reset_index(drop=True)
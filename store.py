@@ -0,0 +1,234 @@
+"""Optional local SQLite persistence for the caseload, one row per client."""
+import sqlite3
+import threading
+
+# Mirrors the Client interface in types.ts
+COLUMNS = ("id", "name", "ndis_number", "level", "rate", "budget", "balance", "plan_end", "hours", "notes", "exited")
+# What the dashboard needs at startup; notes are fetched on demand
+PROJECTION = tuple(c for c in COLUMNS if c != "notes")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    ndis_number TEXT NOT NULL DEFAULT '',
+    level TEXT,
+    rate REAL,
+    budget REAL,
+    balance REAL,
+    plan_end TEXT,
+    hours REAL,
+    notes TEXT NOT NULL DEFAULT '',
+    exited INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS clients_ndis ON clients (ndis_number);
+CREATE TABLE IF NOT EXISTS rates (
+    effective_from TEXT NOT NULL,
+    level TEXT NOT NULL,
+    rate REAL NOT NULL,
+    PRIMARY KEY (effective_from, level)
+);
+CREATE TABLE IF NOT EXISTS claims (
+    client_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    hours REAL NOT NULL DEFAULT 0,
+    amount REAL NOT NULL,
+    line_item TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS claims_client_date ON claims (client_id, date);
+CREATE TABLE IF NOT EXISTS snapshots (
+    day TEXT NOT NULL,
+    client_id TEXT NOT NULL,
+    balance REAL,
+    surplus REAL,
+    weekly_cost REAL,
+    plan_end TEXT,
+    status TEXT,
+    gone INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS snapshots_client_day ON snapshots (client_id, day);
+CREATE INDEX IF NOT EXISTS snapshots_day ON snapshots (day);
+CREATE TABLE IF NOT EXISTS ai_notes (
+    prompt_hash TEXT PRIMARY KEY,
+    note TEXT NOT NULL
+);
+"""
+
+def _row(client):
+    return (
+        client.id, client.name or '', client.ndis_number or '', client.level,
+        client.rate, client.budget, client.balance,
+        None if client.plan_end is None else client.plan_end.isoformat(),
+        client.hours, client.notes or '', int(client.exited),
+    )
+
+def _record(columns, values):
+    record = dict(zip(columns, values))
+    # Only flag exited participants, so records keep the JSON backup shape
+    if not record.pop('exited', 0):
+        return record
+    record['exited'] = True
+    return record
+
+class CaseloadStore:
+    """SQLite (WAL) store for client records. Writes take Clients; reads return JSON-shape dicts.
+
+    Every write touches only the rows it is given and bumps version, which
+    callers can use to tell whether an export is out of date. A single
+    connection is shared across Streamlit sessions, so calls are serialised
+    on a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, rows):
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+            self.version += 1
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM clients")[0][0]
+
+    def load_projection(self):
+        """All records without their notes, in insertion order."""
+        rows = self._query(f"SELECT {', '.join(PROJECTION)} FROM clients ORDER BY rowid")
+        return [_record(PROJECTION, row) for row in rows]
+
+    def export_records(self):
+        """Full records, notes included, in the JSON backup shape."""
+        rows = self._query(f"SELECT {', '.join(COLUMNS)} FROM clients ORDER BY rowid")
+        return [_record(COLUMNS, row) for row in rows]
+
+    def get_notes(self, client_id):
+        rows = self._query("SELECT notes FROM clients WHERE id = ?", (client_id,))
+        return rows[0][0] if rows else ''
+
+    def load_notes(self):
+        """{id: notes} for every client with a non-empty note."""
+        return dict(self._query("SELECT id, notes FROM clients WHERE notes != ''"))
+
+    def _upsert_sql(self, columns):
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "id")
+        return (f"INSERT INTO clients ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}")
+
+    def save(self, clients):
+        """Inserts or updates the given Clients.
+
+        Clients loaded as a projection have notes None; their stored notes
+        are left untouched rather than blanked.
+        """
+        full, projected = [], []
+        for r in clients:
+            if r.notes is not None:
+                full.append(_row(r))
+            else:
+                projected.append(tuple(v for c, v in zip(COLUMNS, _row(r)) if c != "notes"))
+        with self._lock, self._conn:
+            if full:
+                self._conn.executemany(self._upsert_sql(COLUMNS), full)
+            if projected:
+                self._conn.executemany(self._upsert_sql(PROJECTION), projected)
+            self.version += 1
+
+    def delete(self, client_id):
+        self._write("DELETE FROM clients WHERE id = ?", [(client_id,)])
+
+    def set_notes(self, client_id, notes):
+        self._write("UPDATE clients SET notes = ? WHERE id = ?", [(notes, client_id)])
+
+    def replace_all(self, clients):
+        """Swaps the whole table for a restored backup in one transaction."""
+        rows = [_row(c) for c in clients]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM clients")
+            self._conn.executemany(f"INSERT OR REPLACE INTO clients ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            self.version += 1
+
+    def load_rates(self):
+        """The saved rate table in RateTable.to_records() form; empty if none was ever saved."""
+        rows = self._query("SELECT effective_from, level, rate FROM rates ORDER BY effective_from, level")
+        return [{"effective_from": d, "level": level, "rate": rate} for d, level, rate in rows]
+
+    def replace_rates(self, records):
+        """Swaps the saved rate table in one transaction."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rates")
+            self._conn.executemany("INSERT INTO rates (effective_from, level, rate) VALUES (?, ?, ?)",
+                                   [(r["effective_from"], r["level"], r["rate"]) for r in records])
+            self.version += 1
+
+    def add_claims(self, rows):
+        """Appends (client_id, date, hours, amount, line_item) rows; rows may be any iterable, consumed once."""
+        self._write("INSERT INTO claims (client_id, date, hours, amount, line_item) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def claims_for(self, client_id, limit=None):
+        """One participant's claims as (date, hours, amount, line_item), newest first."""
+        sql = "SELECT date, hours, amount, line_item FROM claims WHERE client_id = ? ORDER BY date DESC, rowid DESC"
+        if limit:
+            return self._query(sql + " LIMIT ?", (client_id, int(limit)))
+        return self._query(sql, (client_id,))
+
+    def claim_totals_since(self, day):
+        """(client_id, date, total amount) for every day after `day` (ISO) that has claims."""
+        return self._query("SELECT client_id, date, SUM(amount) FROM claims WHERE date > ? GROUP BY client_id, date", (day,))
+
+    def first_claims(self):
+        """(client_id, date of first claim) for every participant with claims."""
+        return self._query("SELECT client_id, MIN(date) FROM claims GROUP BY client_id")
+
+    def add_snapshots(self, rows):
+        """Appends (day, client_id, balance, surplus, weekly_cost, plan_end, status, gone) delta rows."""
+        self._write("INSERT INTO snapshots (day, client_id, balance, surplus, weekly_cost, plan_end, status, gone) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def snapshot_rows(self, client_id=None, until=None):
+        """Snapshot delta rows in the order written, optionally for one participant and up to a day (ISO)."""
+        sql = "SELECT day, client_id, balance, surplus, weekly_cost, plan_end, status, gone FROM snapshots"
+        where, params = [], []
+        if client_id is not None:
+            where.append("client_id = ?")
+            params.append(client_id)
+        if until is not None:
+            where.append("day <= ?")
+            params.append(until)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._query(sql + " ORDER BY rowid", params)
+
+    def snapshot_status_rows(self, since, until):
+        """(day, client_id, status, gone) rows up to `until` for participants whose status or presence changed after `since`."""
+        return self._query(
+            "SELECT day, client_id, status, gone FROM snapshots WHERE (status IS NOT NULL OR gone = 1) AND day <= ? "
+            "AND client_id IN (SELECT client_id FROM snapshots WHERE status IS NOT NULL AND day > ? AND day <= ?) ORDER BY rowid",
+            (until, since, until))
+
+    def get_ai_notes(self, prompt_hashes):
+        """{prompt_hash: note} for the hashes that have a cached note."""
+        found = {}
+        # Bounded batches keep clear of SQLite's host-parameter limit
+        for i in range(0, len(prompt_hashes), 500):
+            batch = prompt_hashes[i:i + 500]
+            found.update(self._query(f"SELECT prompt_hash, note FROM ai_notes WHERE prompt_hash IN ({', '.join('?' * len(batch))})", batch))
+        return found
+
+    def put_ai_notes(self, rows):
+        """Caches (prompt_hash, note) rows, replacing any earlier note for the same hash."""
+        self._write("INSERT OR REPLACE INTO ai_notes (prompt_hash, note) VALUES (?, ?)", rows)
+
+    def count_ai_notes(self):
+        return self._query("SELECT COUNT(*) FROM ai_notes")[0][0]
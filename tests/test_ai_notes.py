@@ -0,0 +1,87 @@
+import threading
+import time
+
+from ai_notes import FakeBackend, NoteCache, NoteGenerator, RateLimiter
+from store import CaseloadStore
+
+def generator(backend, **kwargs):
+    kwargs = {"requests_per_minute": None, "backoff": 0.001, **kwargs}
+    return NoteGenerator(backend, **kwargs)
+
+class PeakBackend(FakeBackend):
+    """Records the most requests in flight at once."""
+
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.active = self.peak = 0
+        self._peak_lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._peak_lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return super().generate(prompt)
+        finally:
+            with self._peak_lock:
+                self.active -= 1
+
+def test_transient_failures_are_retried():
+    backend = FakeBackend(fail_first=2)
+    results = generator(backend, retries=3).generate_batch({i: f"prompt {i}" for i in range(5)})
+    assert all(r["note"] and r["error"] is None for r in results.values())
+    assert backend.calls == 15
+
+def test_failures_past_the_retry_limit_are_reported_per_participant():
+    backend = FakeBackend(fail_first=5)
+    results = generator(backend, retries=2).generate_batch({"a": "prompt a"})
+    assert results["a"]["note"] is None
+    assert results["a"]["error"].startswith("FakeBackendError")
+    assert backend.calls == 3
+
+def test_repeated_prompts_hit_the_cache():
+    backend = FakeBackend()
+    gen = generator(backend)
+    note = gen.generate("same prompt")
+    assert gen.generate("same prompt") == note
+    assert backend.calls == 1
+    # Identical prompts in a batch share one request, and a second batch makes none
+    results = gen.generate_batch({"a": "same prompt", "b": "other prompt", "c": "other prompt"})
+    assert results["a"] == {"note": note, "error": None, "cached": True}
+    assert results["b"]["note"] == results["c"]["note"]
+    assert backend.calls == 2
+    assert all(r["cached"] for r in gen.generate_batch({"a": "same prompt", "b": "other prompt"}).values())
+    assert backend.calls == 2
+
+def test_cached_notes_survive_in_the_store(tmp_path):
+    store = CaseloadStore(str(tmp_path / "notes.db"))
+    generator(FakeBackend(), cache=NoteCache(store)).generate("kept prompt")
+    backend = FakeBackend()
+    generator(backend, cache=NoteCache(store)).generate("kept prompt")
+    assert backend.calls == 0
+    store.close()
+
+def test_concurrency_is_capped():
+    backend = PeakBackend(latency=0.05)
+    started = time.monotonic()
+    generator(backend, concurrency=3).generate_batch({i: f"prompt {i}" for i in range(12)})
+    assert backend.peak == 3
+    # Four rounds of three, not twelve in a row
+    assert time.monotonic() - started < 12 * 0.05
+
+def test_rate_limit_spaces_requests():
+    backend = FakeBackend()
+    calls = []
+    generate = backend.generate
+    backend.generate = lambda prompt: calls.append(time.monotonic()) or generate(prompt)
+    generator(backend, concurrency=4, requests_per_minute=1200).generate_batch({i: f"prompt {i}" for i in range(6)})
+    # 1200 a minute is one every 50ms, however many threads are waiting: six requests span five gaps
+    assert len(calls) == 6
+    assert max(calls) - min(calls) >= 0.24
+
+def test_no_rate_limit_never_waits():
+    limiter = RateLimiter(None)
+    started = time.monotonic()
+    for _ in range(100):
+        limiter.acquire()
+    assert time.monotonic() - started < 0.05
@@ -0,0 +1,32 @@
+import pytest
+
+from backup import frame_to_records, read_backup, records_to_frame, write_backup
+from models import clients_from_records
+
+def round_trip(records):
+    return frame_to_records(read_backup(write_backup(records)))
+
+def test_round_trip_matches_what_the_records_load_as():
+    records = [
+        {"id": "a", "name": "Ann", "ndis_number": "430000001", "level": "Level 2: Coordination of Supports",
+         "rate": 100.14, "budget": "$18,000", "balance": " 1,250.50 ", "plan_end": "2030-06-30", "hours": 1.5, "notes": "n"},
+        {"id": "b", "name": "Bob", "budget": 5000, "balance": 4000, "plan_end": "2029-01-31", "hours_per_week": "2", "exited": True},
+        {"id": "c", "name": "Cy", "budget": "", "balance": None, "hours": float("nan")},
+    ]
+    expected, errors = clients_from_records(records)
+    assert not errors
+    restored, errors = clients_from_records(round_trip(records))
+    assert not errors
+    assert [c.to_dict() for c in restored] == [c.to_dict() for c in expected]
+
+def test_odd_plan_end_text_survives():
+    assert round_trip([{"id": "a", "plan_end": "soon"}])[0]["plan_end"] == "soon"
+
+def test_unparseable_numbers_are_reported_not_dropped():
+    records = [{"id": "a", "budget": 100}, {"id": "b", "budget": "lots"}]
+    with pytest.raises(ValueError, match=r"record 2, budget: not a number: 'lots'"):
+        records_to_frame(records)
+
+def test_many_distinct_levels():
+    records = [{"id": str(i), "name": "x", "level": f"Custom level {i}", "budget": 1} for i in range(300)]
+    assert [r["level"] for r in round_trip(records)] == [r["level"] for r in records]
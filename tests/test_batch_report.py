@@ -0,0 +1,32 @@
+import json
+
+import pandas as pd
+
+from batch_report import main, process_caseload
+from benchmarks.synthetic import generate_caseload
+
+def write_backup(path, records):
+    path.write_text(json.dumps(records), encoding="utf-8")
+
+def test_invalid_rows_are_counted_and_reported(tmp_path, capsys):
+    backups = tmp_path / "backups"
+    backups.mkdir()
+    records = generate_caseload(20, seed=9)
+    records[3]["balance"] = "about ten grand"
+    records[8]["hours"] = "n/a"
+    write_backup(backups / "north.json", records)
+    write_backup(backups / "south.json", generate_caseload(10, seed=10))
+
+    row = process_caseload(backups / "north.json", tmp_path)
+    assert (row["clients"], row["skipped"], row["error"]) == (18, 2, "")
+
+    out_dir = tmp_path / "reports"
+    assert main([str(backups), "-o", str(out_dir), "-w", "1"]) == 0
+    summary = pd.read_csv(out_dir / "caseload_summary.csv").set_index("caseload")
+    assert summary.loc["north", "skipped"] == 2
+    assert summary.loc["south", "skipped"] == 0
+    assert summary.loc["TOTAL", "skipped"] == 2
+    assert summary.loc["TOTAL", "clients"] == 28
+    err = capsys.readouterr().err
+    assert "SKIPPED north: 2 record(s) with invalid numbers left out" in err
+    assert "south" not in err
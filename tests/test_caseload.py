@@ -0,0 +1,34 @@
+from caseload import Caseload
+
+def record(id, ndis, **fields):
+    return {"id": id, "name": f"Client {id}", "ndis_number": ndis, "budget": 20000, "balance": 15000,
+            "plan_end": "2030-06-30", "hours": 1.5, **fields}
+
+def test_shared_ndis_number_survives_removing_one_record():
+    caseload = Caseload([record("a", "430111111"), record("b", "430111111")])
+    caseload.remove("b")
+    assert caseload.find_by_ndis("430111111").id == "a"
+    assert caseload.ids_for_ndis(["430111111", "430999999"]) == ["a", None]
+    summary = caseload.upsert([record("new", "430111111", balance=9000)])
+    assert summary["inserted"] == [] and len(summary["updated"]) == 1
+    assert len(caseload) == 1
+    assert caseload.get("a").balance == 9000
+
+def test_changing_ndis_number_moves_the_index_entry():
+    caseload = Caseload([record("a", "430111111"), record("b", "430111111")])
+    caseload.update("b", ndis_number="430222222")
+    assert caseload.find_by_ndis("430111111").id == "a"
+    assert caseload.find_by_ndis("430222222").id == "b"
+
+def test_mark_missing_exited_covers_every_record_on_a_number():
+    caseload = Caseload([record("a", "430111111"), record("b", "430111111"), record("c", "430333333")])
+    summary = caseload.upsert([record("x", "430333333")], mark_missing_exited=True)
+    assert sorted(r["id"] for r in summary["exited"]) == ["a", "b"]
+    assert not caseload.get("c").exited
+
+def test_full_change_log_still_answers_for_the_latest_write():
+    caseload = Caseload([record(str(i), str(430000000 + i)) for i in range(1000)])
+    before = caseload.financial_version
+    caseload.update("7", balance=1.0)
+    assert caseload.changed_since(before) == ["7"]
+    assert caseload.changed_since(before - 1) is None
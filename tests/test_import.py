@@ -0,0 +1,51 @@
+import datetime
+import io
+
+from caseload import Caseload
+from ledger import ClaimsLedger
+from models import Client, parse_money
+from utils import import_csv, parse_money_column
+
+def csv_file(text):
+    return io.StringIO(text.strip() + "\n")
+
+def test_money_column_matches_scalar_parser():
+    raw = ["$1,000", " 12 ", "", None, "abc", "nan", "$", "-$5", 7, 2.5]
+    values, bad = parse_money_column(raw)
+    for value, parsed, invalid in zip(raw, values, bad):
+        try:
+            expected = parse_money(value)
+        except ValueError:
+            assert invalid
+            continue
+        assert not invalid
+        assert (parsed != parsed) if expected is None else parsed == expected
+
+def test_client_accepts_accounting_style_money():
+    client = Client.from_dict({"name": "A", "budget": "$18,000", "balance": " 1,250.50 ", "hours": ""})
+    assert (client.budget, client.balance, client.hours) == (18000.0, 1250.5, 0.0)
+
+def test_csv_import_reports_bad_rows():
+    clients, errors = import_csv(csv_file("""
+Name,NDIS Number,Support Level,Total Budget,Current Balance,Plan End Date (YYYY-MM-DD),Hours Per Week
+Ann,430000001,Level 2: Coordination of Supports,"$18,000",15000,2030-06-30,1.5
+Bob,430000002,Level 2: Coordination of Supports,lots,15000,2030-06-30,1.5
+"""))
+    assert [c.name for c in clients] == ["Ann"]
+    assert clients[0].budget == 18000.0
+    assert errors == [{"row": 3, "column": "Total Budget", "reason": "not a number: 'lots'"}]
+
+def test_claims_import_reports_bad_rows():
+    caseload = Caseload([{"id": "a", "name": "Ann", "ndis_number": "430000001", "balance": 1000, "rate": 100, "hours": 1}])
+    ledger = ClaimsLedger()
+    today = datetime.date.today().isoformat()
+    recorded, errors = ledger.import_csv(caseload, csv_file(f"""
+NDIS Number,Date (YYYY-MM-DD),Hours,Amount,Line Item
+430000001,{today},,"$250",x
+430000001,{today},2,,x
+430000009,{today},1,,x
+430000001,{today},,twelve,x
+"""))
+    assert recorded == 2
+    assert caseload.get("a").balance == 1000 - 250 - 200
+    assert [(e["row"], e["column"]) for e in errors] == [(4, "NDIS Number"), (5, "Amount"), (5, "Hours")]
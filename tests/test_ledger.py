@@ -0,0 +1,23 @@
+import datetime
+
+import pytest
+
+from benchmarks.synthetic import generate_caseload
+from caseload import Caseload
+from ledger import ClaimsLedger
+from store import CaseloadStore
+
+def test_unknown_participant_records_nothing(tmp_path):
+    store = CaseloadStore(str(tmp_path / "caseload.db"))
+    caseload = Caseload(generate_caseload(5, seed=2), store=store)
+    ledger = ClaimsLedger(store)
+    known = next(iter(caseload))
+    claims = [{"client_id": known.id, "date": datetime.date.today(), "hours": 0, "amount": 500.0, "line_item": ""},
+              {"client_id": "no-such-id", "date": datetime.date.today(), "hours": 0, "amount": 500.0, "line_item": ""}]
+    with pytest.raises(KeyError, match="no-such-id"):
+        ledger.append(caseload, claims)
+    assert caseload.get(known.id).balance == known.balance
+    assert store.claims_for(known.id) == []
+    assert ledger.trailing_burn(known.id) is None
+    assert ledger.version == 0
+    store.close()
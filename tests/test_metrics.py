@@ -0,0 +1,53 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from utils import calculate_caseload_metrics, calculate_client_metrics
+
+PLAN_END = (datetime.date.today() + datetime.timedelta(weeks=30)).isoformat()
+COMPARED = ["hours", "weekly_cost", "runway_weeks", "surplus", "status", "depletion_date"]
+
+def record(**fields):
+    return {"id": "a", "name": "A", "level": "Level 2: Coordination of Supports", "rate": 100.14,
+            "budget": 20000, "balance": 9000, "plan_end": PLAN_END, **fields}
+
+EDGE_CASES = [
+    record(hours=2.0),
+    record(hours=2.0, hours_per_week=5),
+    record(hours=0, hours_per_week=5),
+    record(hours="", hours_per_week=5),
+    record(hours=None, hours_per_week="3"),
+    record(hours=""),
+    record(hours=None),
+    record(),
+    record(hours=None, hours_per_week=None),
+    record(hours="", hours_per_week=""),
+    record(hours="abc", hours_per_week=5),
+    record(hours="0", hours_per_week=5),
+    record(hours="1.5"),
+    record(hours=0),
+]
+
+@pytest.mark.parametrize("rec", EDGE_CASES, ids=lambda r: f"hours={r.get('hours', '-')!r},hpw={r.get('hours_per_week', '-')!r}")
+def test_vectorised_matches_scalar(rec):
+    expected = calculate_client_metrics(rec)
+    result = calculate_caseload_metrics(pd.DataFrame([rec]))
+    if expected is None:
+        assert result.empty
+        return
+    assert len(result) == 1
+    row = result.iloc[0]
+    for field in COMPARED:
+        value = expected[field]
+        assert row[field] == (pytest.approx(value) if isinstance(value, float) else value), field
+
+def test_vectorised_matches_scalar_row_by_row():
+    records = [r for r in EDGE_CASES if "hours_per_week" in r]
+    result = calculate_caseload_metrics(pd.DataFrame(records))
+    kept = [i for i, r in enumerate(records) if calculate_client_metrics(r) is not None]
+    assert result.index.tolist() == kept
+    for i in kept:
+        expected = calculate_client_metrics(records[i])
+        assert result.loc[i, "hours"] == expected["hours"]
+        assert result.loc[i, "status"] == expected["status"]
@@ -0,0 +1,59 @@
+import datetime
+import random
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_caseload
+from caseload import Caseload
+from ledger import ClaimsLedger
+from utils import MetricsCache
+
+def assert_fresh(cache, caseload, ledger=None):
+    pd.testing.assert_frame_equal(cache.metrics_for(caseload, ledger), MetricsCache().metrics_for(caseload, ledger))
+
+def test_incremental_updates_match_a_full_recompute():
+    rng = random.Random(0)
+    records = generate_caseload(3000, seed=4)
+    caseload = Caseload(records[:2000])
+    ledger = ClaimsLedger()
+    cache = MetricsCache()
+    assert_fresh(cache, caseload)
+    for step in range(40):
+        ids = [c.id for c in caseload]
+        target = rng.choice(ids)
+        action = step % 5
+        if action == 0:
+            caseload.update(target, balance=rng.uniform(0, 20000), hours=rng.choice([0.5, 2.0, 4.0]))
+        elif action == 1:
+            caseload.remove(target)
+        elif action == 2:
+            caseload.append(records[2000 + step])
+        elif action == 3:
+            caseload.update(target, exited=True)
+        else:
+            ledger.append(caseload, [{"client_id": target, "date": datetime.date.today(), "hours": 3, "amount": None, "line_item": ""}])
+        assert_fresh(cache, caseload, ledger if step % 2 else None)
+    assert cache.stats()["updates"] > 0
+
+def test_single_edit_recomputes_one_row():
+    caseload = Caseload(generate_caseload(1000, seed=5))
+    cache = MetricsCache()
+    cache.metrics_for(caseload)
+    caseload.update(next(iter(caseload)).id, balance=10.0)
+    cache.metrics_for(caseload)
+    cache.metrics_for(caseload)
+    stats = cache.stats()
+    assert (stats["rebuilds"], stats["updates"], stats["hits"]) == (1, 1, 1)
+    assert stats["rows_computed"] == 1001
+    assert stats["size"] == 1000
+
+def test_compaction_forces_a_rebuild():
+    caseload = Caseload(generate_caseload(2100, seed=6))
+    cache = MetricsCache()
+    cache.metrics_for(caseload)
+    for i, c in enumerate(list(caseload)[:1100]):
+        caseload.remove(c.id)
+        # The 1,050th removal leaves half the rows dead and compacts
+        if i % 50 == 0 or i == 1049:
+            cache.metrics_for(caseload)
+    assert_fresh(cache, caseload)
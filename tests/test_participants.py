@@ -0,0 +1,63 @@
+import datetime
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_caseload
+from caseload import Caseload
+from utils import STATUS_RANK, MetricsCache, filter_participants, participant_page
+
+def metrics(n=400, seed=3):
+    return MetricsCache().metrics_for(Caseload(generate_caseload(n, seed=seed)))
+
+def test_health_sort_puts_the_worst_first():
+    df = metrics()
+    page, _ = participant_page(df, page_size=len(df), sort="Health")
+    ranks = [STATUS_RANK[s] for s in page['status']]
+    assert ranks == sorted(ranks)
+    assert page['status'].iloc[0] == "CRITICAL SHORTFALL"
+    page, _ = participant_page(df, page_size=len(df), sort="Health", descending=True)
+    assert page['status'].iloc[0] == "ROBUST SURPLUS"
+
+def test_filters_combine():
+    df = metrics()
+    today = datetime.date.today()
+    level = df['level'].iloc[0]
+    result = filter_participants(df, statuses=["CRITICAL SHORTFALL", "MONITORING REQUIRED"], levels=[level], plan_end_window="Next 90 days")
+    assert len(result) > 0
+    assert result['status'].isin(["CRITICAL SHORTFALL", "MONITORING REQUIRED"]).all()
+    assert (result['level'] == level).all()
+    assert result['plan_end'].between(today, today + datetime.timedelta(days=90)).all()
+    assert len(filter_participants(df)) == len(df)
+
+def test_search_matches_name_or_ndis_number():
+    df = metrics()
+    row = df.iloc[17]
+    assert filter_participants(df, search=f"  {row['name'].upper()} ")['id'].tolist() == [row['id']]
+    assert row['id'] in filter_participants(df, search=row['ndis_number'][-4:])['id'].tolist()
+    assert filter_participants(df, search="nobody by this name").empty
+
+def test_plan_end_windows():
+    df = metrics()
+    today = datetime.date.today()
+    assert (filter_participants(df, plan_end_window="Already ended")['plan_end'] < today).all()
+    later = filter_participants(df, plan_end_window="Later than 6 months")
+    assert (later['plan_end'] >= today + datetime.timedelta(days=183)).all()
+    assert len(later) + len(filter_participants(df, plan_end_window="Next 6 months")) + len(filter_participants(df, plan_end_window="Already ended")) == len(df)
+
+def test_pages_cover_every_row_once():
+    df = metrics(n=230)
+    pages = [participant_page(df, page=p, page_size=50)[0] for p in range(1, 6)]
+    assert participant_page(df, page_size=50)[1] == 5
+    assert pd.concat(pages)['id'].tolist() == df['id'].tolist()
+    # Out-of-range pages are clamped
+    assert participant_page(df, page=99, page_size=50)[0]['id'].tolist() == pages[-1]['id'].tolist()
+    assert participant_page(df.iloc[:0], page=3)[1] == 1
+
+def test_sorts():
+    df = metrics()
+    page, _ = participant_page(df, page_size=len(df), sort="Runway", descending=True)
+    assert page['runway_weeks'].is_monotonic_decreasing
+    page, _ = participant_page(df, page_size=10, sort="Name")
+    assert page['name'].tolist() == sorted(df['name'])[:10]
+    page, _ = participant_page(df, page_size=len(df), sort="Added", descending=True)
+    assert page['id'].tolist() == df['id'].tolist()[::-1]
@@ -0,0 +1,44 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_caseload
+from caseload import Caseload
+from projection import project_portfolio
+from utils import MetricsCache
+
+def participant(id, balance, weeks):
+    plan_end = datetime.date.today() + datetime.timedelta(weeks=weeks)
+    return {"id": id, "name": id, "ndis_number": "", "level": "Level 2: Coordination of Supports", "rate": 100.14,
+            "budget": 20000, "balance": balance, "hours": 2.0, "plan_end": plan_end.isoformat()}
+
+def price_rise(caseload, factor=1.5, weeks=8):
+    table = caseload.rate_table
+    effective = datetime.date.today() + datetime.timedelta(weeks=weeks)
+    caseload.set_rate_table(table.with_version(effective, {level: rate * factor for level, rate in table.rates_on().items()}))
+
+def test_projection_bills_scheduled_price_changes():
+    # One lasts to plan end, one runs out after the rise
+    caseload = Caseload([participant("lasts", 10000, 20), participant("short", 3000, 30)])
+    price_rise(caseload)
+    metrics = MetricsCache().metrics_for(caseload).set_index("id")
+    for client_id in metrics.index:
+        row = metrics.loc[[client_id]]
+        proj = project_portfolio(row, 40, rate_table=caseload.rate_table)
+        if client_id == "lasts":
+            # Left at plan end is the surplus, and everything before it was billed
+            assert proj.loc[proj['week'] == 20, 'funds_remaining'].item() == pytest.approx(row['surplus'].item())
+            assert proj.loc[proj['week'] < 20, 'revenue'].sum() == pytest.approx(row['balance'].item() - row['surplus'].item())
+        else:
+            runway = row['runway_weeks'].item()
+            assert 8 < runway < 30
+            assert proj.loc[proj['running_out'] == 1, 'week'].tolist() == [int(np.floor(runway))]
+            assert proj['revenue'].sum() == pytest.approx(row['balance'].item())
+            assert proj.loc[proj['week'] == int(runway) + 1, 'funds_remaining'].item() == 0
+
+def test_flat_table_projection_is_unchanged():
+    caseload = Caseload(generate_caseload(300, seed=6))
+    metrics = MetricsCache().metrics_for(caseload)
+    pd.testing.assert_frame_equal(project_portfolio(metrics, 26, rate_table=caseload.rate_table), project_portfolio(metrics, 26))
@@ -0,0 +1,46 @@
+import datetime
+
+from benchmarks.synthetic import generate_caseload
+from caseload import Caseload
+from depletion import DepletionIndex
+from snapshots import SnapshotHistory
+from utils import MetricsCache
+
+def future_price_rise(caseload, factor=1.5, days=60):
+    effective = datetime.date.today() + datetime.timedelta(days=days)
+    table = caseload.rate_table
+    return table.with_version(effective, {level: rate * factor for level, rate in table.rates_on().items()})
+
+def test_new_rate_table_rebuilds_the_depletion_index():
+    caseload = Caseload(generate_caseload(2000, seed=1))
+    cache, index = MetricsCache(), DepletionIndex()
+    index.sync(caseload, cache)
+    before = len(index)
+    caseload.set_rate_table(future_price_rise(caseload))
+    assert caseload.changed_since(caseload.financial_version - 1) is None
+    index.sync(caseload, cache)
+    fresh = DepletionIndex()
+    fresh.sync(caseload, MetricsCache())
+    assert len(index) > before
+    assert index.next(len(fresh)) == fresh.next(len(fresh))
+
+def test_new_rate_table_is_captured_in_the_history():
+    caseload = Caseload(generate_caseload(500, seed=2))
+    history = SnapshotHistory()
+    history.capture(caseload)
+    caseload.set_rate_table(future_price_rise(caseload))
+    assert history.capture(caseload) > 0
+
+def test_sync_keeps_negotiated_rates():
+    caseload = Caseload([{"id": "a", "name": "Ann", "ndis_number": "430000001", "level": "Level 2: Coordination of Supports",
+                          "rate": 120.0, "budget": 20000, "balance": 15000, "hours": 1.5, "plan_end": "2030-06-30"}])
+    # A CSV row is priced from the guide
+    row = {"name": "Ann", "ndis_number": "430000001", "level": "Level 2: Coordination of Supports",
+           "rate": 100.14, "budget": 20000, "balance": 14000, "hours": 1.5, "plan_end": "2030-06-30"}
+    summary = caseload.upsert([row])
+    assert list(summary["updated"][0]["changes"]) == ["balance"]
+    assert caseload.get("a").rate == 120.0
+    caseload.upsert([row], sync_rates=True)
+    assert caseload.get("a").rate == 100.14
+    caseload.upsert([{**row, "level": "Level 3: Specialist Support Coordination", "rate": 190.41}])
+    assert caseload.get("a").rate == 190.41
@@ -0,0 +1,42 @@
+import datetime
+import random
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_caseload
+from caseload import Caseload
+from ledger import ClaimsLedger
+from simulation import SimulationCache, simulate_caseload
+from utils import MetricsCache
+
+def test_zero_spread_reproduces_depletion_dates():
+    rng = random.Random(0)
+    caseload = Caseload(generate_caseload(500, seed=7))
+    metrics = MetricsCache().metrics_for(caseload)
+    # Balances that run out exactly at the end of a day, where rounding the week to a date is most fragile
+    for client_id, weekly_cost in zip(metrics['id'], metrics['weekly_cost']):
+        caseload.update(client_id, balance=weekly_cost * rng.randrange(1, 400) / 7)
+    metrics = MetricsCache().metrics_for(caseload)
+    sim = simulate_caseload(metrics, trials=3, cv=0, workers=1)
+
+    short = metrics['runway_weeks'] < metrics['weeks_remaining']
+    assert (sim['shortfall_probability'] == short.astype(float)).all()
+    expected = pd.to_datetime(metrics['depletion_date']).dt.date.where(short, None)
+    for column in ("depletion_p10", "depletion_p50", "depletion_p90"):
+        assert sim[column].tolist() == expected.tolist()
+
+def test_cache_follows_the_burn_basis():
+    caseload = Caseload(generate_caseload(50, seed=8))
+    ledger = ClaimsLedger()
+    today = datetime.date.today()
+    ids = [c.id for c in caseload][:10]
+    # Claims well above the planned hours, so actual burn runs these participants short
+    ledger.append(caseload, [{"client_id": i, "date": today - datetime.timedelta(days=d), "hours": 0, "amount": 2000.0, "line_item": ""}
+                             for i in ids for d in (3, 10, 17)])
+    cache = SimulationCache(trials=50)
+    planned = MetricsCache().metrics_for(caseload)
+    actual = MetricsCache().metrics_for(caseload, ledger)
+    cache.results_for(caseload, planned)
+    result = cache.results_for(caseload, actual)
+    pd.testing.assert_frame_equal(result, simulate_caseload(actual, trials=50))
+    assert result.loc[actual['id'].isin(ids), 'shortfall_probability'].gt(0).all()
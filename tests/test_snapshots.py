@@ -0,0 +1,85 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from snapshots import SNAPSHOT_FIELDS, SnapshotHistory
+from store import CaseloadStore
+
+START = datetime.date(2026, 3, 1)
+PLAN_END = datetime.date(2026, 12, 31)
+
+def frame(day, people):
+    """A metrics frame for `day` from {id: (balance, weekly_cost, status)}, surplus drifting as the plan runs down."""
+    rows = []
+    for client_id, (balance, weekly_cost, status) in people.items():
+        weeks_left = max((PLAN_END - day).days, 0) / 7
+        rows.append({"id": client_id, "balance": balance, "weekly_cost": weekly_cost, "plan_end": PLAN_END,
+                     "status": status, "surplus": balance - weekly_cost * weeks_left})
+    return pd.DataFrame(rows, columns=["id"] + SNAPSHOT_FIELDS)
+
+# Day by day: untouched days, a balance edit, a status change, an exit, a join, a price change and a return
+DAYS = [
+    {"a": (9000, 200, "SUSTAINABLE"), "b": (4000, 150, "CRITICAL SHORTFALL"), "c": (7000, 100, "ROBUST SURPLUS")},
+    {"a": (9000, 200, "SUSTAINABLE"), "b": (4000, 150, "CRITICAL SHORTFALL"), "c": (7000, 100, "ROBUST SURPLUS")},
+    {"a": (8500, 200, "MONITORING REQUIRED"), "b": (4000, 150, "CRITICAL SHORTFALL"), "c": (7000, 100, "ROBUST SURPLUS")},
+    {"a": (8500, 200, "MONITORING REQUIRED"), "b": (4000, 150, "CRITICAL SHORTFALL")},
+    {"a": (8500, 200, "MONITORING REQUIRED"), "b": (4000, 150, "CRITICAL SHORTFALL"), "d": (5000, 120, "SUSTAINABLE")},
+    {"a": (8500, 250, "CRITICAL SHORTFALL"), "b": (6000, 150, "SUSTAINABLE"), "d": (5000, 120, "SUSTAINABLE")},
+    {"a": (8500, 250, "CRITICAL SHORTFALL"), "b": (6000, 150, "SUSTAINABLE"), "c": (6900, 100, "ROBUST SURPLUS"), "d": (5000, 120, "SUSTAINABLE")},
+]
+
+def record_days(history):
+    written = []
+    for offset, people in enumerate(DAYS):
+        written.append(history.record(frame(START + datetime.timedelta(days=offset), people), START + datetime.timedelta(days=offset)))
+    return written
+
+def assert_replays(history):
+    end = START + datetime.timedelta(days=len(DAYS) - 1)
+    for client_id in "abcd":
+        series = history.series(client_id, START, end).set_index("day")
+        present = [START + datetime.timedelta(days=o) for o, people in enumerate(DAYS) if client_id in people]
+        assert series.index.tolist() == present
+        for day in present:
+            expected = frame(day, {client_id: DAYS[(day - START).days][client_id]}).iloc[0]
+            for field in ("balance", "weekly_cost", "plan_end", "status"):
+                assert series.loc[day, field] == expected[field], (client_id, day, field)
+            assert series.loc[day, "surplus"] == pytest.approx(expected["surplus"])
+
+def test_only_changes_are_stored():
+    history = SnapshotHistory()
+    written = record_days(history)
+    # Day one stores everyone; an untouched day stores nothing, surplus drift included
+    assert written[:2] == [3, 0]
+    # a's edit; c leaving; d joining; a and b changing; c returning
+    assert written[2:] == [1, 1, 1, 2, 1]
+
+def test_replay_reproduces_every_day():
+    history = SnapshotHistory()
+    record_days(history)
+    assert_replays(history)
+
+def test_status_changes():
+    history = SnapshotHistory()
+    record_days(history)
+    changes = history.status_changes(START)
+    assert list(zip(changes['client_id'], changes['day'], changes['previous'], changes['status'], changes['worsened'])) == [
+        ("a", START + datetime.timedelta(days=2), "SUSTAINABLE", "MONITORING REQUIRED", True),
+        ("a", START + datetime.timedelta(days=5), "MONITORING REQUIRED", "CRITICAL SHORTFALL", True),
+        ("b", START + datetime.timedelta(days=5), "CRITICAL SHORTFALL", "SUSTAINABLE", False),
+    ]
+    assert history.status_changes(START + datetime.timedelta(days=2)).shape[0] == 2
+
+def test_store_backed_history_reloads_its_state(tmp_path):
+    store = CaseloadStore(str(tmp_path / "snapshots.db"))
+    history = SnapshotHistory(store)
+    record_days(history)
+    assert_replays(history)
+    reloaded = SnapshotHistory(store)
+    assert reloaded.rows == history.rows
+    pd.testing.assert_frame_equal(reloaded._state.sort_index(), history._state.sort_index(), check_dtype=False, check_names=False)
+    # Picks up where it left off: an untouched next day stores nothing, even for the re-anchored surplus
+    next_day = START + datetime.timedelta(days=len(DAYS))
+    assert reloaded.record(frame(next_day, DAYS[-1]), next_day) == 0
+    store.close()
@@ -0,0 +1,90 @@
+from benchmarks.synthetic import generate_caseload
+from caseload import Caseload
+from store import CaseloadStore
+
+class RecordingStore(CaseloadStore):
+    """Notes which rows each write was given."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.saved, self.deleted, self.notes_reads = [], [], 0
+
+    def save(self, clients):
+        clients = list(clients)
+        self.saved.append([c.id for c in clients])
+        super().save(clients)
+
+    def delete(self, client_id):
+        self.deleted.append(client_id)
+        super().delete(client_id)
+
+    def load_notes(self):
+        self.notes_reads += 1
+        return super().load_notes()
+
+def stored(path):
+    store = CaseloadStore(path)
+    records = {r["id"]: r for r in store.export_records()}
+    store.close()
+    return records
+
+def test_edits_write_only_their_rows(tmp_path):
+    path = str(tmp_path / "caseload.db")
+    records = generate_caseload(200, seed=11)
+    store = RecordingStore(path)
+    caseload = Caseload.restore(records[:150], store=store)
+    store.saved.clear()
+    ids = [c.id for c in caseload]
+
+    caseload.update(ids[3], balance=1234.5)
+    caseload.append(records[150])
+    caseload.remove(ids[7])
+    caseload.apply_claims([ids[10], ids[10], ids[11]], [100.0, 50.0, 25.0])
+    assert store.saved == [[ids[3]], [records[150]["id"]], [ids[10], ids[11]]]
+    assert store.deleted == [ids[7]]
+    store.close()
+
+    saved = stored(path)
+    assert len(saved) == 150
+    assert ids[7] not in saved
+    assert saved[ids[3]]["balance"] == 1234.5
+    assert saved[ids[10]]["balance"] == records[10]["balance"] - 150.0
+
+def test_projection_load_reads_notes_on_demand(tmp_path):
+    path = str(tmp_path / "caseload.db")
+    records = generate_caseload(100, seed=12)
+    records[5]["notes"] = "Plan review booked."
+    seed = CaseloadStore(path)
+    Caseload.restore(records, store=seed)
+    seed.close()
+
+    store = RecordingStore(path)
+    caseload = Caseload.from_store(store)
+    assert all("notes" not in r for r in store.load_projection())
+    assert caseload.get(records[5]["id"]).notes is None
+    assert caseload.notes(records[5]["id"]) == "Plan review booked."
+
+    # A financial edit to a projected record leaves its stored note alone
+    caseload.update(records[5]["id"], balance=10.0)
+    assert stored(path)[records[5]["id"]]["notes"] == "Plan review booked."
+
+    # Everything still missing comes in with one query
+    assert caseload.load_notes() == 99
+    assert store.notes_reads == 1
+    assert [c.notes for c in caseload] == [r["notes"] for r in records]
+    assert caseload.load_notes() == 0
+    store.close()
+
+def test_notes_are_written_alone(tmp_path):
+    path = str(tmp_path / "caseload.db")
+    store = RecordingStore(path)
+    caseload = Caseload.restore(generate_caseload(20, seed=13), store=store)
+    store.saved.clear()
+    client_id = next(iter(caseload)).id
+    caseload.set_notes(client_id, "Called the participant.")
+    assert store.saved == []
+    store.close()
+    reopened = Caseload.from_store(CaseloadStore(path))
+    assert reopened.notes(client_id) == "Called the participant."
+    assert reopened.get(client_id).balance == caseload.get(client_id).balance
+    reopened._store.close()
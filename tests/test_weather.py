@@ -0,0 +1,102 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from weather import CAPITALS, WeatherService, split_forecasts
+
+def forecast(temp, code=0):
+    return {"current": {"temperature_2m": temp, "weather_code": code},
+            "daily": {"weather_code": [code, code], "temperature_2m_max": [temp, temp + 1]}}
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers each request with the server's next queued payload, or that HTTP status if it's an int."""
+
+    def do_GET(self):
+        server = self.server
+        server.calls.append(parse_qs(urlparse(self.path).query))
+        if server.gate is not None:
+            server.gate.wait(5)
+        response = server.responses.pop(0)
+        status, body = (response, b"") if isinstance(response, int) else (200, json.dumps(response).encode())
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub():
+    """A local Open-Meteo stand-in. Queue payloads on .responses; set .gate to hold requests in flight."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.responses, server.calls, server.gate = [], [], None
+    server.url = f"http://127.0.0.1:{server.server_port}/v1/forecast"
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    if server.gate is not None:
+        server.gate.set()
+    server.shutdown()
+    server.server_close()
+
+def test_split_forecasts_maps_cities_in_order():
+    payload = [forecast(i) for i in range(len(CAPITALS))]
+    payload[2] = {"current": {}}  # malformed entry
+    cards = split_forecasts(payload)
+    assert list(cards) == list(CAPITALS)
+    assert cards["Canberra"] == {"curr_temp": 0, "curr_icon": "☀️", "tmrw_temp": 1, "tmrw_icon": "☀️"}
+    assert cards["Melbourne"] is None
+    assert cards["Darwin"]["curr_temp"] == 7
+
+def test_split_forecasts_single_location_object():
+    cards = split_forecasts(forecast(20, code=61), {"Sydney": CAPITALS["Sydney"]})
+    assert cards == {"Sydney": {"curr_temp": 20, "curr_icon": "🌧️", "tmrw_temp": 21, "tmrw_icon": "🌧️"}}
+
+def test_one_request_for_all_capitals(stub):
+    stub.responses.append([forecast(i) for i in range(len(CAPITALS))])
+    weather = WeatherService(base_url=stub.url).get()
+    assert len(stub.calls) == 1
+    assert stub.calls[0]["latitude"][0].split(",") == [str(c["lat"]) for c in CAPITALS.values()]
+    assert all(weather[city]["time"] for city in CAPITALS)
+    assert weather["Hobart"]["curr_temp"] == 6
+
+def test_stale_data_served_while_refreshing(stub):
+    stub.responses += [[forecast(10)] * len(CAPITALS), [forecast(30)] * len(CAPITALS)]
+    service = WeatherService(base_url=stub.url, ttl=0)
+    assert service.get()["Perth"]["curr_temp"] == 10
+    stub.gate = threading.Event()
+    # Expired: the old forecast comes straight back while one refresh waits on the server
+    assert service.get()["Perth"]["curr_temp"] == 10
+    assert service.get()["Perth"]["curr_temp"] == 10
+    refresher = service._refresher
+    stub.gate.set()
+    refresher.join(5)
+    assert len(stub.calls) == 2
+    service.ttl = 3600
+    assert service.get()["Perth"]["curr_temp"] == 30
+
+def test_failed_fetch_keeps_last_good_data(stub):
+    partial = [forecast(15)] * len(CAPITALS)
+    partial[0] = {}
+    stub.responses += [[forecast(12)] * len(CAPITALS), 503, partial]
+    service = WeatherService(base_url=stub.url)
+    service.get()
+    service._refresh()  # the whole request fails
+    assert service.get()["Canberra"]["curr_temp"] == 12
+    service._refresh()  # only Canberra fails
+    weather = service.get()
+    assert weather["Canberra"]["curr_temp"] == 12
+    assert weather["Sydney"]["curr_temp"] == 15
+
+def test_slow_upstream_times_out(stub):
+    stub.responses += [[forecast(12)] * len(CAPITALS), [forecast(20)] * len(CAPITALS)]
+    service = WeatherService(base_url=stub.url, timeout=0.2)
+    service.get()
+    stub.gate = threading.Event()
+    service._refresh()  # gives up after the timeout rather than hanging the page
+    assert service.get()["Perth"]["curr_temp"] == 12
@@ -21,6 +21,7 @@ export interface Client {
   plan_end: string; // ISO String YYYY-MM-DD
   hours: number;
   notes: string;
+  exited?: boolean; // set by an NDIS-number sync when absent from the import
 }
 
 export interface ClientMetrics extends Client {
@@ -1,53 +1,148 @@
 import datetime
 from datetime import timedelta
+import numpy as np
 import pandas as pd
-from docx import Document
-from docx.shared import Pt, RGBColor
 import io
 import uuid
+import hashlib
+from perf import timed
+from models import Client, RATES, parse_money
+from rates import rate_schedule, repriced_rates
 
 # --- CONSTANTS ---
-RATES = {
-    "Level 2: Coordination of Supports": 100.14,
-    "Level 3: Specialist Support Coordination": 190.41
+
+STATUS_COLORS = {
+    "ROBUST SURPLUS": "#3fb950",
+    "SUSTAINABLE": "#2ea043",
+    "MONITORING REQUIRED": "#d29922",
+    "CRITICAL SHORTFALL": "#f85149"
 }
 
+METRIC_COLUMNS = ["id", "name", "ndis_number", "level", "rate", "budget", "balance", "hours", "plan_end",
+                  "weeks_remaining", "weekly_cost", "runway_weeks", "depletion_date", "surplus", "status", "color", "notes"]
+
 # --- CSV HANDLERS ---
+CSV_HEADERS = ["Name", "NDIS Number", "Support Level", "Total Budget", "Current Balance", "Plan End Date (YYYY-MM-DD)", "Hours Per Week"]
+CSV_NUMERIC = {"Total Budget": "budget", "Current Balance": "balance", "Hours Per Week": "hours"}
+CSV_CHUNK_ROWS = 20000
+
+# --- FILE INPUT ---
+def parse_money_column(raw):
+    """parse_money() over a whole column. Returns (float Series, NaN where blank or bad; mask of the bad ones)."""
+    raw = pd.Series(raw, dtype=object) if not isinstance(raw, pd.Series) else raw
+    values = pd.to_numeric(raw, errors='coerce').astype(float)
+    # Only what didn't parse as it stands is cleaned up and tried again
+    retry = values.isna() & raw.notna()
+    if not retry.any():
+        return values, retry
+    text = raw[retry].astype(str).str.strip().str.replace(r"[$,]", "", regex=True)
+    values[retry] = pd.to_numeric(text, errors='coerce')
+    bad = values.isna() & retry
+    bad[retry] &= (text != "") & (text.str.lower() != "nan")
+    return values, bad
+
+class RowErrors:
+    """Row-level problems found while validating one chunk of a file, as {"row", "column", "reason"}.
+
+    Problems are appended to the shared errors list; bad marks every row
+    that had one so the caller can skip them. Row numbers are counted from
+    first_row, which by default is a spreadsheet's line number for the
+    first data row (the header is row 1).
+    """
+
+    def __init__(self, frame, errors, first_row=2):
+        self.frame = frame
+        self.errors = errors
+        self.first_row = first_row
+        self.bad = pd.Series(False, index=frame.index)
+
+    def report(self, mask, column, reason):
+        """Flags the rows in mask; reason may use {value} for the offending value."""
+        self.bad |= mask
+        for i, value in self.frame.loc[mask, column].items():
+            self.errors.append({"row": i + self.first_row, "column": column, "reason": reason.format(value=value)})
+
 def generate_csv_template():
     """Creates a blank CSV template for bulk imports."""
-    df = pd.DataFrame(columns=["Name", "NDIS Number", "Support Level", "Total Budget", "Current Balance", "Plan End Date (YYYY-MM-DD)", "Hours Per Week"])
+    df = pd.DataFrame(columns=CSV_HEADERS)
     df.loc[0] = ["John Doe", "430123456", "Level 2: Coordination of Supports", 18000, 15000, (datetime.date.today() + timedelta(weeks=40)).strftime("%Y-%m-%d"), 1.5]
     return df.to_csv(index=False).encode('utf-8')
 
-def process_csv_upload(uploaded_file):
-    """Converts uploaded CSV into the app's client dictionary format."""
+def _import_chunk(chunk, errors, rates):
+    """Validates one CSV chunk column-wise. Appends problems to errors and returns the good rows as Clients."""
+    today = datetime.date.today()
+    rows = RowErrors(chunk, errors)
+    report = rows.report
+
+    out = pd.DataFrame(index=chunk.index)
+    if "Name" in chunk:
+        out["name"] = chunk["Name"].str.strip()
+        report(out["name"].isna() | (out["name"] == ""), "Name", "missing name")
+    else:
+        out["name"] = "Unknown"
+    out["ndis_number"] = chunk["NDIS Number"].str.strip().fillna("") if "NDIS Number" in chunk else ""
+    if "Support Level" in chunk:
+        out["level"] = chunk["Support Level"].str.strip().fillna("Level 2: Coordination of Supports")
+    else:
+        out["level"] = "Level 2: Coordination of Supports"
+    out["rate"] = out["level"].map(rates).fillna(100.14).astype(float)
+
+    for column, field in CSV_NUMERIC.items():
+        if column not in chunk:
+            out[field] = 0.0
+            continue
+        raw = chunk[column].str.strip()
+        values, invalid = parse_money_column(raw)
+        report(raw.isna() | (raw == ""), column, "missing value")
+        report(invalid, column, "not a number: '{value}'")
+        out[field] = values
+
+    date_col = "Plan End Date (YYYY-MM-DD)"
+    if date_col in chunk:
+        raw = chunk[date_col].str.strip()
+        parsed = pd.to_datetime(raw, format="%Y-%m-%d", errors='coerce')
+        report(raw.isna() | (raw == ""), date_col, "missing date")
+        report(parsed.isna() & raw.notna() & (raw != ""), date_col, "not a YYYY-MM-DD date: '{value}'")
+        out["plan_end"] = parsed.dt.date
+    else:
+        out["plan_end"] = today
+
+    out = out[~rows.bad]
+    out.insert(0, "id", [str(uuid.uuid4()) for _ in range(len(out))])
+    out["notes"] = ""
+    # Already validated column-wise, so rows go straight into Client without from_dict.
+    # zip over plain lists is much cheaper than DataFrame.to_dict on string columns.
+    fields = ["id", "name", "ndis_number", "level", "rate", "budget", "balance", "plan_end", "hours", "notes"]
+    return [Client(*row) for row in zip(*(out[f].tolist() for f in fields))]
+
+@timed()
+def import_csv(uploaded_file, chunksize=CSV_CHUNK_ROWS, rates=None):
+    """Streams a CSV into Client records chunk by chunk. Returns (clients, errors).
+
+    Bad rows are skipped rather than failing the file; each problem is reported
+    as {"row", "column", "reason"}. A file that can't be read at all yields a
+    single error with row and column set to None. Rows are priced from rates
+    ({level: rate}, e.g. a RateTable's current prices), RATES by default.
+    """
+    rates = RATES if rates is None else rates
+    clients, errors = [], []
     try:
-        df = pd.read_csv(uploaded_file)
-        new_clients = []
-        for _, row in df.iterrows():
-            level = row.get("Support Level", "Level 2: Coordination of Supports")
-            rate = RATES.get(level, 100.14)
-            
-            client = {
-                "id": str(uuid.uuid4()),
-                "name": str(row.get("Name", "Unknown")),
-                "ndis_number": str(row.get("NDIS Number", "")),
-                "level": level,
-                "rate": rate,
-                "budget": float(row.get("Total Budget", 0)),
-                "balance": float(row.get("Current Balance", 0)),
-                "plan_end": str(row.get("Plan End Date (YYYY-MM-DD)", datetime.date.today())),
-                "hours": float(row.get("Hours Per Week", 0)),
-                "notes": ""
-            }
-            new_clients.append(client)
-        return new_clients
-    except Exception:
-        return None
+        for chunk in pd.read_csv(uploaded_file, dtype=str, chunksize=chunksize):
+            chunk.columns = chunk.columns.str.strip()
+            clients.extend(_import_chunk(chunk, errors, rates))
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        errors.append({"row": None, "column": None, "reason": f"Could not read file: {e}"})
+    errors.sort(key=lambda e: e["row"] or 0)
+    return clients, errors
+
+def process_csv_upload(uploaded_file):
+    """Converts an uploaded CSV into Client records, skipping bad rows."""
+    clients, errors = import_csv(uploaded_file)
+    return clients if clients or not errors else None
 
 # --- MATH ENGINE ---
-def calculate_client_metrics(c):
-    """Calculates runway, surplus, and status."""
+def _coerce_record(c):
+    """Loose record dict -> (balance, hours, rate, budget, plan_end), or None if a number won't parse."""
     try:
         balance = float(c.get('balance', 0))
         # FIX: Check both 'hours' and 'hours_per_week' to prevent $0 bugs
@@ -67,10 +162,54 @@ def calculate_client_metrics(c):
             
     except Exception:
         return None
+    return balance, hours, rate, budget, plan_end
+
+def _piecewise_burn(balance, hours, starts, seg_rates, weeks_remaining):
+    """(runway_weeks, cost to plan end) as arrays, with the price changing at each segment start.
+
+    Runway is 999 where nothing is ever billed, as in the flat-rate formula.
+    """
+    ends = np.append(starts[1:], np.inf)
+    runway = np.full(len(balance), 999.0)
+    found = np.zeros(len(balance), dtype=bool)
+    remaining = np.asarray(balance, dtype=float).copy()
+    cost_to_end = np.zeros(len(balance))
+    for j in range(len(starts)):
+        cost = hours * seg_rates[:, j]
+        cost_to_end += cost * np.clip(np.minimum(weeks_remaining, ends[j]) - starts[j], 0, None)
+        with np.errstate(invalid='ignore'):
+            capacity = cost * (ends[j] - starts[j])  # inf in the open-ended last segment
+            hit = ~found & (cost > 0) & (remaining <= capacity)
+        runway[hit] = starts[j] + remaining[hit] / cost[hit]
+        found |= hit
+        remaining = np.where(found, remaining, remaining - np.nan_to_num(capacity))
+    return runway, cost_to_end
+
+def calculate_client_metrics(c, rate_table=None, actual_burn=None):
+    """Calculates runway, surplus, and status.
+
+    With a rate_table that has price changes after today, guide-priced
+    participants are billed at each period's price; otherwise the record's
+    rate applies throughout. actual_burn (weekly $, e.g. from the claims
+    ledger) replaces the planned hours x rate when given.
+    """
+    if isinstance(c, Client):
+        # Validated at ingest: nothing to coerce or parse
+        balance, hours, rate, budget = c.balance, c.hours, c.rate, c.budget
+        plan_end = c.plan_end or datetime.date.today() + timedelta(weeks=40)
+    else:
+        fields = _coerce_record(c)
+        if fields is None:
+            return None
+        balance, hours, rate, budget, plan_end = fields
 
     today = datetime.date.today()
     weeks_remaining = max(0, (plan_end - today).days / 7)
     weekly_cost = hours * rate
+    billed_hours = hours
+    if actual_burn is not None:
+        weekly_cost = actual_burn
+        billed_hours = actual_burn / rate if rate > 0 else hours
     
     if weekly_cost > 0:
         runway_weeks = balance / weekly_cost
@@ -78,6 +217,10 @@ def calculate_client_metrics(c):
         runway_weeks = 999
         
     surplus = balance - (weekly_cost * weeks_remaining)
+    if rate_table is not None and rate_table.changes_after(today):
+        starts, seg_rates = rate_schedule([c.get('level')], [rate], rate_table, today)
+        runway, cost_to_end = _piecewise_burn(np.array([balance]), np.array([billed_hours]), starts, seg_rates, np.array([weeks_remaining]))
+        runway_weeks, surplus = float(runway[0]), balance - float(cost_to_end[0])
     depletion_date = today + timedelta(days=int(runway_weeks * 7))
     
     # NDIS Status Logic
@@ -114,28 +257,326 @@ def calculate_client_metrics(c):
         "notes": c.get('notes', '')
     }
 
+def _numeric_column(df, col, default):
+    """Coerces a column to float. Returns (values, invalid_mask); missing values take the default."""
+    if col not in df:
+        return pd.Series(float(default), index=df.index), pd.Series(False, index=df.index)
+    raw = df[col]
+    values = pd.to_numeric(raw, errors='coerce').astype(float)
+    # Present but unparseable is what makes float() raise in the scalar path
+    invalid = values.isna() & raw.notna()
+    return values.fillna(float(default)), invalid
+
+def _falsy_column(raw):
+    """Where `not value` holds, as in a scalar `or`; missing values count as None."""
+    if pd.api.types.is_numeric_dtype(raw):
+        return raw.isna() | (raw == 0)
+    return raw.map(lambda v: v != v or not v).astype(bool)
+
+def _plan_end_column(df, fallback):
+    """Parses plan_end column-wise, using the scalar fallback date for anything unparseable."""
+    if 'plan_end' not in df:
+        return pd.Series(fallback, index=df.index, dtype='datetime64[ns]')
+    raw = df['plan_end']
+    if pd.api.types.is_datetime64_any_dtype(raw):
+        parsed = raw.dt.tz_localize(None) if raw.dt.tz is not None else raw
+        return parsed.dt.normalize().fillna(fallback)
+    parsed = pd.to_datetime(raw.astype(str), format="%Y-%m-%d", errors='coerce')
+    missed = parsed.isna()
+    if missed.any():
+        # date/datetime objects don't round-trip through str() with the strict format
+        as_dates = raw[missed].map(lambda v: v if isinstance(v, datetime.date) else None)
+        parsed[missed] = pd.to_datetime(as_dates, errors='coerce').dt.normalize()
+    return parsed.fillna(fallback)
+
+@timed()
+def calculate_caseload_metrics(df, rate_table=None):
+    """Vectorised calculate_client_metrics over a DataFrame of client records.
+
+    Rows the scalar function would reject are dropped; the original index is kept
+    so results can be matched back to their records. rate_table works as in
+    calculate_client_metrics; an 'actual_burn' column (NaN where unknown)
+    stands in for its actual_burn argument.
+    """
+    if df is None or len(df) == 0:
+        return pd.DataFrame(columns=METRIC_COLUMNS)
+
+    balance, bad_balance = _numeric_column(df, 'balance', 0)
+    rate, bad_rate = _numeric_column(df, 'rate', 100.14)
+    budget, bad_budget = _numeric_column(df, 'budget', 0)
+    hours, bad_hours = _numeric_column(df, 'hours', 0)
+    # The scalar path's `hours or hours_per_week`: only a falsy hours (missing, 0, "") defers, and a
+    # present hours_per_week must then be a number. Missing values in a frame count as None.
+    use_alt = _falsy_column(df['hours']) if 'hours' in df else pd.Series(True, index=df.index)
+    if 'hours_per_week' in df:
+        alt = pd.to_numeric(df['hours_per_week'], errors='coerce').astype(float)
+        hours = hours.where(~use_alt, alt)
+        bad_hours = (bad_hours & ~use_alt) | (use_alt & alt.isna())
+    else:
+        hours = hours.where(~use_alt, 0.0)
+        bad_hours &= ~use_alt
+    valid = ~(bad_balance | bad_rate | bad_budget | bad_hours)
+
+    today = datetime.date.today()
+    today_ts = pd.Timestamp(today)
+    plan_end = _plan_end_column(df, today_ts + pd.Timedelta(weeks=40))
+
+    weeks_remaining = ((plan_end - today_ts).dt.days / 7).clip(lower=0)
+    weekly_cost = hours * rate
+    billed_hours = hours
+    if 'actual_burn' in df:
+        # Rows with a claims history are planned on what is actually being billed
+        actual = pd.to_numeric(df['actual_burn'], errors='coerce').astype(float)
+        weekly_cost = weekly_cost.where(actual.isna(), actual)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            billed_hours = hours.where(actual.isna() | (rate <= 0), actual / rate)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        runway_weeks = pd.Series(np.where(weekly_cost > 0, balance / weekly_cost, 999.0), index=df.index)
+    surplus = balance - (weekly_cost * weeks_remaining)
+    if rate_table is not None and rate_table.changes_after(today):
+        # A price change falls inside some plans: bill each period at its own price
+        levels = df['level'] if 'level' in df else pd.Series(None, index=df.index, dtype=object)
+        starts, seg_rates = rate_schedule(levels, rate, rate_table, today)
+        runway, cost_to_end = _piecewise_burn(balance.to_numpy(), billed_hours.to_numpy(), starts, seg_rates, weeks_remaining.to_numpy())
+        runway_weeks = pd.Series(runway, index=df.index)
+        surplus = balance - cost_to_end
+    depletion_days = np.trunc(runway_weeks * 7)
+    depletion_date = today_ts + pd.to_timedelta(depletion_days, unit='D')
+
+    # NDIS Status Logic
+    conditions = [
+        runway_weeks >= weeks_remaining * 1.2,
+        runway_weeks >= weeks_remaining,
+        runway_weeks >= (weeks_remaining - 4).clip(lower=0),
+    ]
+    choices = ["ROBUST SURPLUS", "SUSTAINABLE", "MONITORING REQUIRED"]
+    # Categorical: one byte per row, and cheap to group and filter on
+    status = pd.Series(pd.Categorical(np.select(conditions, choices, default="CRITICAL SHORTFALL"), categories=list(STATUS_COLORS)), index=df.index)
+
+    def text(col, default):
+        return df[col].where(df[col].notna(), default) if col in df else pd.Series(default, index=df.index, dtype=object)
+
+    out = pd.DataFrame({
+        "id": text('id', None),
+        "name": text('name', 'Unknown'),
+        "ndis_number": text('ndis_number', ''),
+        "level": text('level', None),
+        "rate": rate,
+        "budget": budget,
+        "balance": balance,
+        "hours": hours,
+        "plan_end": plan_end.dt.date,
+        "weeks_remaining": weeks_remaining,
+        "weekly_cost": weekly_cost,
+        "runway_weeks": runway_weeks,
+        "depletion_date": depletion_date.dt.date,
+        "surplus": surplus,
+        "status": status,
+        "color": status.map(STATUS_COLORS),
+        "notes": text('notes', ''),
+    }, index=df.index)
+    return out[valid]
+
+# --- METRICS CACHE ---
+IDENTITY_COLUMNS = ["id", "name", "ndis_number", "level", "notes"]
+DERIVED_COLUMNS = [c for c in METRIC_COLUMNS if c not in IDENTITY_COLUMNS]
+
+class MetricsCache:
+    """Metrics for a Caseload, recomputing only the participants whose financials changed.
+
+    The derived columns are kept per caseload row. When the caseload can
+    name the records written since last time (Caseload.changed_since), just
+    those rows are recomputed and spliced in; a new caseload, a new day,
+    switching the ledger, or a change that reaches every record recomputes
+    everything. Names and notes are read fresh from the caseload's columns
+    on every call, so editing them never triggers a recompute.
+
+    stats() counts calls: hits reused everything, updates recomputed some
+    rows, rebuilds recomputed all of them; rows_computed totals the rows
+    recomputed and size is the number of rows held.
+    """
+
+    def __init__(self):
+        self._derived = None
+        self.clear()
+
+    def __len__(self):
+        return 0 if self._derived is None else len(self._derived)
+
+    def clear(self):
+        self._key = self._derived = None
+        self.hits = self.updates = self.rebuilds = self.rows_computed = 0
+
+    def stats(self):
+        calls = self.hits + self.updates + self.rebuilds
+        return {"hits": self.hits, "updates": self.updates, "rebuilds": self.rebuilds,
+                "rows_computed": self.rows_computed, "size": len(self),
+                "hit_rate": self.hits / calls if calls else 0.0}
+
+    def _compute(self, frame, caseload, ledger):
+        data = frame if ledger is None else frame.assign(actual_burn=ledger.burn_column(frame['id']))
+        self.rows_computed += len(frame)
+        return calculate_caseload_metrics(data, caseload.rate_table)[DERIVED_COLUMNS]
+
+    @timed("MetricsCache.metrics_for")
+    def metrics_for(self, caseload, ledger=None):
+        """The metrics DataFrame for a Caseload's active participants, indexed by caseload row.
+
+        With a ClaimsLedger, participants who have claims are planned on their actual burn.
+        """
+        frame = caseload.frame()
+        token, version = caseload.metrics_key
+        # Claims always move balances, so the ids behind a new ledger version show up in changed_since()
+        key = (token, version, datetime.date.today(), ledger)
+        old = self._key
+        if key == old:
+            self.hits += 1
+        else:
+            changed = caseload.changed_since(old[1]) if old is not None and old[0] is token and old[2:] == key[2:] else None
+            if changed is None:
+                self.rebuilds += 1
+                self._derived = self._compute(frame, caseload, ledger)
+            else:
+                self.updates += 1
+                dirty = frame['id'].isin(changed).to_numpy()
+                derived = self._derived
+                # Rows that changed, were removed or have exited are dropped; changed active ones are recomputed
+                keep = derived.index.isin(frame.index[~dirty])
+                fresh = self._compute(frame[dirty], caseload, ledger) if dirty.any() else None
+                if fresh is not None and len(fresh):
+                    derived = pd.concat([derived[keep], fresh]).sort_index()
+                elif not keep.all():
+                    derived = derived[keep]
+                self._derived = derived
+            self._key = key
+        derived = self._derived
+        return pd.concat([frame.loc[derived.index, IDENTITY_COLUMNS], derived], axis=1)[METRIC_COLUMNS]
+
+# --- REPRICING ---
+@timed()
+def reprice_preview(caseload, table, day=None):
+    """What adopting `table` and repricing to day's prices would do, before anything is changed.
+
+    Compares the caseload's current metrics (its own table and rates) with
+    metrics under the candidate table and repriced rates. Returns (summary,
+    changes): changes lists every active participant whose rate or surplus
+    moves, biggest drop in surplus first.
+    """
+    frame = caseload.frame()
+    before = calculate_caseload_metrics(frame, caseload.rate_table)
+    after = calculate_caseload_metrics(frame.assign(rate=repriced_rates(frame['level'], frame['rate'], table, day)), table)
+    changes = pd.DataFrame({
+        "id": before['id'], "name": before['name'], "level": before['level'],
+        "old_rate": before['rate'], "new_rate": after['rate'],
+        "old_surplus": before['surplus'], "new_surplus": after['surplus'],
+        "surplus_change": after['surplus'] - before['surplus'],
+        "old_status": before['status'], "new_status": after['status'],
+    })
+    repriced = changes['old_rate'] != changes['new_rate']
+    changes = changes[repriced | ~np.isclose(changes['old_surplus'], changes['new_surplus'])]
+    summary = {
+        "repriced": int(repriced.sum()),
+        "affected": len(changes),
+        "surplus_change": float(changes['surplus_change'].sum()),
+        "status_changes": int((changes['old_status'] != changes['new_status']).sum()),
+    }
+    return summary, changes.sort_values('surplus_change', kind='stable')
+
+# --- PARTICIPANT TABLE ---
+# Plan-end windows as (from, to) days relative to today; None leaves that side open
+PLAN_END_WINDOWS = {
+    "Any time": (None, None),
+    "Already ended": (None, -1),
+    "Next 30 days": (0, 30),
+    "Next 90 days": (0, 90),
+    "Next 6 months": (0, 182),
+    "Later than 6 months": (183, None),
+}
+SORT_COLUMNS = {"Added": None, "Name": "name", "End Date": "plan_end", "Health": "status", "Runway": "runway_weeks", "Outcome": "surplus"}
+# Worst first, so an ascending Health sort surfaces the participants needing attention
+STATUS_RANK = {s: i for i, s in enumerate(["CRITICAL SHORTFALL", "MONITORING REQUIRED", "SUSTAINABLE", "ROBUST SURPLUS"])}
+
+@timed()
+def filter_participants(df, search="", statuses=None, levels=None, plan_end_window="Any time"):
+    """Rows of a metrics DataFrame matching every filter given. Empty filters match everything."""
+    mask = pd.Series(True, index=df.index)
+    search = search.strip()
+    if search:
+        mask &= (df['name'].astype(str).str.contains(search, case=False, regex=False)
+                 | df['ndis_number'].astype(str).str.contains(search, case=False, regex=False))
+    if statuses:
+        mask &= df['status'].isin(statuses)
+    if levels:
+        mask &= df['level'].isin(levels)
+    start, end = PLAN_END_WINDOWS[plan_end_window]
+    today = datetime.date.today()
+    if start is not None:
+        mask &= df['plan_end'] >= today + timedelta(days=start)
+    if end is not None:
+        mask &= df['plan_end'] <= today + timedelta(days=end)
+    return df[mask]
+
+@timed()
+def participant_page(df, page=1, page_size=50, sort="Added", descending=False):
+    """One page of the (already filtered) table, sorted. Returns (page_df, page_count); page is clamped."""
+    page_count = max(1, -(-len(df) // page_size))
+    page = min(max(page, 1), page_count)
+    column = SORT_COLUMNS[sort]
+    if column is not None:
+        # status is Categorical, and mapping one keeps its category order: rank on plain ints
+        key = (lambda s: s.astype(object).map(STATUS_RANK)) if column == 'status' else None
+        df = df.sort_values(column, ascending=not descending, kind='stable', key=key)
+    elif descending:
+        df = df.iloc[::-1]
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size], page_count
+
 # --- WORD REPORT GENERATOR ---
-def generate_caseload_report(caseload_data):
-    """Generates a professional Word doc."""
+REPORT_FIELDS = ["name", "status", "balance", "surplus", "notes"]
+
+def _report_rows(caseload_data):
+    """(name, status, balance, surplus, notes) per participant, from a metrics DataFrame or metric dicts."""
+    if isinstance(caseload_data, pd.DataFrame):
+        return list(zip(*(caseload_data[f].tolist() for f in REPORT_FIELDS)))
+    return [tuple(c[f] for f in REPORT_FIELDS) for c in caseload_data]
+
+@timed()
+def report_fingerprint(caseload_data):
+    """Hashes everything the Word report prints, so an unchanged caseload can reuse its last build."""
+    df = caseload_data if isinstance(caseload_data, pd.DataFrame) else pd.DataFrame(list(caseload_data), columns=REPORT_FIELDS)
+    h = hashlib.sha1(datetime.date.today().isoformat().encode())
+    h.update(pd.util.hash_pandas_object(df[REPORT_FIELDS], index=False).values.tobytes())
+    return h.hexdigest()
+
+@timed()
+def generate_caseload_report(caseload_data, progress=None):
+    """Generates a professional Word doc from a metrics DataFrame (or metric dicts). progress(done, total) is called roughly every 1%."""
+    # python-docx is only needed once a report is asked for, so it stays off the startup path
+    from docx import Document
+    rows = _report_rows(caseload_data)
     doc = Document()
     doc.add_heading('XYSTON | Caseload Master Report', 0)
     doc.add_paragraph(f"Date: {datetime.date.today().strftime('%d %B %Y')}")
     
-    total_funds = sum(c['balance'] for c in caseload_data)
+    total_funds = sum(balance for _, _, balance, _, _ in rows)
     
     doc.add_heading('Executive Summary', 1)
-    doc.add_paragraph(f"Total Clients: {len(caseload_data)}")
+    doc.add_paragraph(f"Total Clients: {len(rows)}")
     doc.add_paragraph(f"Funds Under Management: ${total_funds:,.2f}")
     
-    for c in caseload_data:
+    total = len(rows)
+    step = max(1, total // 100)
+    for i, (name, status, balance, surplus, notes) in enumerate(rows, 1):
         doc.add_page_break()
-        doc.add_heading(f"{c['name']}", 1)
-        doc.add_paragraph(f"Status: {c['status']}")
-        doc.add_paragraph(f"Balance: ${c['balance']:,.2f}")
-        doc.add_paragraph(f"Outcome: ${c['surplus']:,.2f}")
-        if c['notes']:
+        doc.add_heading(f"{name}", 1)
+        doc.add_paragraph(f"Status: {status}")
+        doc.add_paragraph(f"Balance: ${balance:,.2f}")
+        doc.add_paragraph(f"Outcome: ${surplus:,.2f}")
+        if notes:
             doc.add_heading('Strategy', 2)
-            doc.add_paragraph(c['notes'])
+            doc.add_paragraph(notes)
+        if progress and (i % step == 0 or i == total):
+            progress(i, total)
             
     bio = io.BytesIO()
     doc.save(bio)
@@ -0,0 +1,122 @@
+"""Capital-city weather for the zero-state dashboard (Open-Meteo)."""
+import datetime
+import threading
+import time
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+CAPITALS = {
+    "Canberra": {"lat": -35.28, "lng": 149.13, "tz": "Australia/Canberra"},
+    "Sydney": {"lat": -33.86, "lng": 151.20, "tz": "Australia/Sydney"},
+    "Melbourne": {"lat": -37.81, "lng": 144.96, "tz": "Australia/Melbourne"},
+    "Brisbane": {"lat": -27.47, "lng": 153.02, "tz": "Australia/Brisbane"},
+    "Perth": {"lat": -31.95, "lng": 115.86, "tz": "Australia/Perth"},
+    "Adelaide": {"lat": -34.92, "lng": 138.60, "tz": "Australia/Adelaide"},
+    "Hobart": {"lat": -42.88, "lng": 147.32, "tz": "Australia/Hobart"},
+    "Darwin": {"lat": -12.46, "lng": 130.84, "tz": "Australia/Darwin"},
+}
+
+def get_weather_icon(code):
+    if code <= 1: return "☀️"
+    if code <= 3: return "⛅"
+    if code <= 48: return "🌫️"
+    if code <= 67: return "🌧️"
+    if code <= 77: return "🌨️"
+    if code <= 82: return "⛈️"
+    return "🌦️"
+
+def local_time(tz_name, now=None):
+    """Wall-clock time for a capital, computed locally rather than fetched."""
+    import pytz
+    now = now or datetime.datetime.now(pytz.utc)
+    return now.astimezone(pytz.timezone(tz_name)).strftime("%I:%M %p")
+
+def parse_forecast(res):
+    """Turns one location's Open-Meteo forecast into a weather card (minus the time)."""
+    return {
+        "curr_temp": round(res['current']['temperature_2m']),
+        "curr_icon": get_weather_icon(res['current']['weather_code']),
+        "tmrw_temp": round(res['daily']['temperature_2m_max'][1]),
+        "tmrw_icon": get_weather_icon(res['daily']['weather_code'][1])
+    }
+
+def batch_params(cities=CAPITALS):
+    """Query for a single multi-location request; Open-Meteo answers with a list in the same order."""
+    return {
+        "latitude": ",".join(str(c['lat']) for c in cities.values()),
+        "longitude": ",".join(str(c['lng']) for c in cities.values()),
+        "current": "temperature_2m,weather_code",
+        "daily": "weather_code,temperature_2m_max,temperature_2m_min",
+        "timezone": "auto",
+    }
+
+def split_forecasts(payload, cities=CAPITALS):
+    """Fans a batched response back out to {city: card or None}."""
+    # A single location comes back as a bare object rather than a list
+    if isinstance(payload, dict):
+        payload = [payload]
+    cards = {}
+    for city, res in zip(cities, payload):
+        try:
+            cards[city] = parse_forecast(res)
+        except (KeyError, IndexError, TypeError):
+            cards[city] = None
+    return cards
+
+class WeatherService:
+    """Batched Open-Meteo fetcher with stale-while-revalidate caching.
+
+    All capitals are fetched in one multi-location request. get() serves
+    cached forecasts while they are younger than ttl; after that the stale
+    data keeps being served while a single background thread refreshes it,
+    so only the very first call waits on the network. Cities that fail to
+    refresh keep their last good reading. Local times are stamped on every
+    get() from the tz entries, never fetched.
+    """
+
+    def __init__(self, base_url=OPEN_METEO_URL, ttl=3600, timeout=5, session=None):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.session = session  # created on the first fetch, so requests is only imported when weather is shown
+        self._lock = threading.Lock()
+        self._data = None
+        self._fetched_at = 0.0
+        self._refresher = None
+
+    def fetch(self):
+        """Fetches every capital in one request. Failed cities map to None."""
+        import requests
+        if self.session is None:
+            self.session = requests.Session()
+        try:
+            res = self.session.get(self.base_url, params=batch_params(), timeout=self.timeout)
+            res.raise_for_status()
+            return split_forecasts(res.json())
+        except (requests.RequestException, ValueError):
+            return dict.fromkeys(CAPITALS)
+
+    def _store(self, fresh):
+        with self._lock:
+            previous = self._data or {}
+            self._data = {city: fresh.get(city) or previous.get(city) for city in CAPITALS}
+            self._fetched_at = time.monotonic()
+            return self._data
+
+    def _refresh(self):
+        self._store(self.fetch())
+
+    def _forecasts(self):
+        with self._lock:
+            data = self._data
+            if data is not None:
+                if time.monotonic() - self._fetched_at >= self.ttl and not (self._refresher and self._refresher.is_alive()):
+                    self._refresher = threading.Thread(target=self._refresh, daemon=True)
+                    self._refresher.start()
+                return data
+        return self._store(self.fetch())
+
+    def get(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return {city: {**card, "time": local_time(CAPITALS[city]['tz'], now)} if card else None
+                for city, card in self._forecasts().items()}